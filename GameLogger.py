@@ -1,6 +1,26 @@
 import pandas as pd
 import os
 
+MOVE_COLUMNS = ['GameID', 'Action', 'Row', 'Col', 'Result', 'Adjacent3x3']
+
+
+def get_adjacent_3x3(game, row, col):
+    adjacent_3x3 = []
+    for r in range(row - 1, row + 2):
+        row_data = []
+        for c in range(col - 1, col + 2):
+            if 0 <= r < game.rows and 0 <= c < game.cols:
+                if game.revealed[r][c]:
+                    row_data.append(game.board[r][c])
+                elif game.flags[r][c]:
+                    row_data.append('F')
+                else:
+                    row_data.append(None)
+            else:
+                row_data.append(-4)
+        adjacent_3x3.append(row_data)
+    return adjacent_3x3
+
 
 class GameLogger:
     def __init__(self, filename="game_log.csv"):
@@ -10,8 +30,7 @@ class GameLogger:
 
     def _ensure_file_exists(self):
         if not os.path.isfile(self.filename):
-            columns = ['GameID', 'Action', 'Row', 'Col', 'Result', 'Adjacent3x3']
-            pd.DataFrame(columns=columns).to_csv(self.filename, index=False)
+            pd.DataFrame(columns=MOVE_COLUMNS).to_csv(self.filename, index=False)
 
     def get_last_game_id(self):
         if os.path.isfile(self.filename):
@@ -24,21 +43,7 @@ class GameLogger:
         self.game_id += 1
 
     def _get_adjacent_3x3(self, game, row, col):
-        adjacent_3x3 = []
-        for r in range(row - 1, row + 2):
-            row_data = []
-            for c in range(col - 1, col + 2):
-                if 0 <= r < game.rows and 0 <= c < game.cols:
-                    if game.revealed[r][c]:
-                        row_data.append(game.board[r][c])
-                    elif game.flags[r][c]:
-                        row_data.append('F')
-                    else:
-                        row_data.append(None)
-                else:
-                    row_data.append(-4)
-            adjacent_3x3.append(row_data)
-        return adjacent_3x3
+        return get_adjacent_3x3(game, row, col)
 
     def log_move(self, action, row, col, result, game):
         adjacent_3x3 = self._get_adjacent_3x3(game, row, col)
@@ -1,139 +1,135 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.utils import class_weight
-import pickle
+from collections import OrderedDict
+import model_registry
+from train_forest import train_forest
+from board_analysis import BoardAnalysis
+import instrumentation
+import tracing
 
-class Random_Forest:
-    def __init__(self, game, model_path="model.pkl", data_path='game_log_processed_data.csv'):
-        self.game = game
-        self._model_path = model_path
-        self._model = None
-        self._features = None
-        self._target = None
-
-        if not self._load_model():
-            print("Nie znaleziono zapisanego modelu. Rozpoczynam proces nauki.")
-            if data_path:
-                self._load_and_preprocess_data(data_path)
-                self._train_model()
-            else:
-                print("Brak ścieżki do danych treningowych. Model nie może być wytrenowany.")
-
-    def _load_and_preprocess_data(self, file_path):
-        try:
-            data = pd.read_csv(file_path)
-            print("Dane wczytane.")
-
-            data = self._validate_data(data)
-
-            self._features = data.drop(columns=["Label"]).values
-            self._target = data["Label"].values
-
-            print("Dane przetworzone.")
-
-            unique_classes = np.unique(self._target)
-            print(f"Unikalne klasy w danych: {unique_classes}")
-
-            all_classes = np.arange(np.min(self._target), np.max(self._target) + 1)
-            missing_classes = set(all_classes) - set(unique_classes)
-
-            if missing_classes:
-                print(f"Brakujące klasy: {missing_classes}. Dodawanie ich do danych.")
-                for missing_class in missing_classes:
-                    missing_data = np.zeros((self._target == missing_class).sum(), self._features.shape[1])
-                    missing_target = np.full(missing_data.shape[0], missing_class)
-                    self._features = np.vstack([self._features, missing_data])
-                    self._target = np.hstack([self._target, missing_target])
-
-        except Exception as e:
-            print(f"Błąd podczas przetwarzania danych: {e}")
-            self._features, self._target = None, None
-
-    def _validate_data(self, data):
-        data = data.dropna()
-
-        for col in data.columns:
-            if not pd.to_numeric(data[col], errors='coerce').notnull().all():
-                print(f"Kolumna {col} zawiera niepoprawne dane. Usuwam te wiersze.")
-                data = data[pd.to_numeric(data[col], errors='coerce').notnull()]
-
-        return data
-
-    def _train_model(self):
-        if self._features is None or self._target is None:
-            print("Brak przetworzonych danych. Nie można wytrenować modelu.")
-            return
-
-        try:
-            class_weights = class_weight.compute_class_weight(
-                class_weight="balanced",
-                classes=np.unique(self._target),
-                y=self._target
-            )
-            class_weights_dict = {i: weight for i, weight in enumerate(class_weights)}
+PATTERN_BASE = 13
+PATTERN_WEIGHTS = PATTERN_BASE ** np.arange(9, dtype=np.int64)
 
-            self._model = RandomForestClassifier(
-                n_estimators=100,
-                random_state=42,
-                class_weight=class_weights_dict
-            )
+_pattern_caches = {}
 
-            self._model.fit(self._features, self._target)
-            print("Model został wytrenowany z balansem klas.")
 
-            self._save_model()
+def encode_patterns(features):
+    return (np.asarray(features, dtype=np.int64).reshape(-1, 9) + 4) @ PATTERN_WEIGHTS
 
-        except Exception as e:
-            print(f"Błąd podczas trenowania modelu: {e}")
 
-    def _save_model(self):
-        try:
-            with open(self._model_path, "wb") as file:
-                pickle.dump(self._model, file)
-                print(f"Model zapisany do pliku: {self._model_path}")
-        except Exception as e:
-            print(f"Błąd podczas zapisywania modelu: {e}")
-
-    def _load_model(self):
-        try:
-            with open(self._model_path, "rb") as file:
-                self._model = pickle.load(file)
-                print("Model wczytany.")
-                return True
-        except FileNotFoundError:
-            print(f"Plik {self._model_path} nie istnieje. Trzeba wytrenować model.")
-        except Exception as e:
-            print(f"Błąd podczas wczytywania modelu: {e}")
-        return False
+class Random_Forest:
+    def __init__(self, game, model_path="model.pkl", data_path='game_log_processed_data.csv',
+                 cache_size=65536, prefill_cache=False, analysis=None):
+        self.game = game
+        self._analysis = analysis or BoardAnalysis(game)
+        self._model_path = model_path
+        self._data_path = data_path
+        self._cache_size = cache_size
+
+        if prefill_cache and data_path:
+            self.prefill_cache(data_path)
+
+    @property
+    def _forest(self):
+        return model_registry.get_forest(self._model_path, self._train)
+
+    @property
+    def _pattern_cache(self):
+        forest = self._forest
+        cached_forest, cache = _pattern_caches.get(self._model_path, (None, None))
+        if cached_forest is not forest:
+            cache = OrderedDict()
+            _pattern_caches[self._model_path] = (forest, cache)
+        return cache
+
+    def _train(self):
+        print("Nie znaleziono zapisanego modelu. Rozpoczynam proces nauki.")
+        if not self._data_path:
+            print("Brak ścieżki do danych treningowych. Model nie może być wytrenowany.")
+            return None
+        return train_forest(self._data_path, self._model_path)
 
     def predict(self, adjacent_matrix):
-        if self._model is None:
-            print("Model nie został wczytany. Nie można dokonać predykcji.")
+        if self._forest is None:
+            tracing.warning("Model nie został wczytany. Nie można dokonać predykcji.")
             return None
 
         try:
-            flat_matrix = np.ravel(adjacent_matrix).reshape(1, -1)
-            prediction_proba = self._model.predict_proba(flat_matrix)
-            return prediction_proba[0][1]
+            return float(self._predict_patterns(np.ravel(adjacent_matrix).reshape(1, -1))[0])
 
         except Exception as e:
             print(f"Błąd podczas predykcji: {e}")
             return None
 
     def predict_game_state(self, game):
-        flagged_fields = []
-        for row in range(game.rows):
-            for col in range(game.cols):
-                if not game.revealed[row][col] and not game.flags[row][col]:
-                    adjacent_matrix = self._get_adjacent_3x3(game, row, col)
-                    if adjacent_matrix is not None:
-                        prob_flagging = self.predict(adjacent_matrix)
-                        print(f"Prawdopodobieństwo flagowania dla ({row}, {col}): {prob_flagging}")
-                        flagged_fields.append((row, col, prob_flagging))
+        if self._forest is None:
+            tracing.warning("Model nie został wczytany. Nie można dokonać predykcji.")
+            return []
+        candidates = ~game.revealed_array & ~game.flags_array
+        if not candidates.any():
+            return []
+
+        features = self._extract_features(game, candidates)
+        instrumentation.count("cells_scanned", len(features), strategy="Random Forest")
+        try:
+            probabilities = self._predict_patterns(features)
+        except Exception as e:
+            print(f"Błąd podczas predykcji: {e}")
+            return []
+
+        flagged_fields = [
+            (int(row), int(col), prob_flagging)
+            for (row, col), prob_flagging in zip(zip(*np.nonzero(candidates)), probabilities.tolist())
+        ]
+        if tracing.enabled_for(tracing.DEBUG):
+            for row, col, prob_flagging in flagged_fields:
+                tracing.debug("Prawdopodobieństwo flagowania dla ({}, {}): {}", row, col, prob_flagging)
 
         return flagged_fields
 
+    def prefill_cache(self, data_path):
+        if self._forest is None:
+            return 0
+        try:
+            features = pd.read_csv(data_path).drop(columns=["Label"]).dropna().values
+        except Exception as e:
+            print(f"Błąd podczas wczytywania wzorców: {e}")
+            return 0
+        features = features[np.isin(features, np.arange(-4, 9)).all(axis=1)]
+        _, first = np.unique(encode_patterns(features), return_index=True)
+        self._predict_patterns(features[np.sort(first)][:self._cache_size])
+        return len(self._pattern_cache)
+
+    def _predict_patterns(self, features):
+        features = np.asarray(features).reshape(-1, 9)
+        codes, first, inverse = np.unique(encode_patterns(features), return_index=True, return_inverse=True)
+        cache = self._pattern_cache
+        probabilities = np.empty(len(codes))
+        missing = []
+        for index, code in enumerate(codes.tolist()):
+            cached = cache.get(code)
+            if cached is None:
+                missing.append(index)
+            else:
+                probabilities[index] = cached
+        instrumentation.cache("pattern_cache", hits=len(codes) - len(missing), misses=len(missing))
+        if missing:
+            predicted = self._forest.predict_proba(features[first[missing]])[:, 1]
+            probabilities[missing] = predicted
+            for code, probability in zip(codes[missing].tolist(), predicted.tolist()):
+                cache[code] = probability
+            while len(cache) > self._cache_size:
+                cache.popitem(last=False)
+        return probabilities[inverse.ravel()]
+
+    def _extract_features(self, game, mask):
+        if game is self._analysis.game:
+            return self._analysis.features(mask)
+        encoded = np.where(game.revealed_array, game.board_array, np.where(game.flags_array, -2, -3))
+        padded = np.pad(encoded, 1, constant_values=-4)
+        windows = np.lib.stride_tricks.sliding_window_view(padded, (3, 3))
+        return windows[mask].reshape(-1, 9)
+
     def _get_adjacent_3x3(self, game, row, col):
         adjacent_matrix = []
         for i in range(row - 1, row + 2):
@@ -149,7 +145,7 @@ class Random_Forest:
                 else:
                     row_data.append(-4)
             adjacent_matrix.append(row_data)
-        print(f"Macierz dla ({row}, {col}): {adjacent_matrix}")
+        tracing.debug("Macierz dla ({}, {}): {}", row, col, adjacent_matrix)
         return adjacent_matrix
 
     def find_flag(self):
@@ -169,10 +165,4 @@ class Random_Forest:
         return None
 
     def _count_discovered_neighbors(self, row, col):
-        discovered_neighbors = 0
-        for i in range(row - 1, row + 2):
-            for j in range(col - 1, col + 2):
-                if 0 <= i < self.game.rows and 0 <= j < self.game.cols:
-                    if self.game.revealed[i][j]:
-                        discovered_neighbors += 1
-        return discovered_neighbors
+        return int(np.count_nonzero(self.game.revealed_array[max(row - 1, 0):row + 2, max(col - 1, 0):col + 2]))
@@ -1,45 +1,122 @@
 import random
+from collections import deque
+import instrumentation
+import tracing
+from board_analysis import BoardAnalysis
 from neighbour_deduction import NeighbourDeduction
 from cluster_inference import ClusterInference
 from Random_Forest_Flagging import Random_Forest
 from monte_carlo_analyzer import MonteCarloAnalyzer
 
 class AIPlayer:
-    def __init__(self, game):
+    def __init__(self, game, seed=None, workers=1, time_budget=None):
         self.game = game
-        self._neighbour_deduction = NeighbourDeduction(game)
-        self._cluster_inference = ClusterInference(game)
-        self._Random_Forest_flagging = Random_Forest(game)
-        self._monte_carlo_analyzer = MonteCarloAnalyzer(game)
+        self._time_budget = time_budget
+        self._analysis = BoardAnalysis(game)
+        self._neighbour_deduction = NeighbourDeduction(game, self._analysis)
+        self._cluster_inference = ClusterInference(game, self._analysis)
+        self._Random_Forest_flagging = Random_Forest(game, analysis=self._analysis)
+        self._monte_carlo_analyzer = MonteCarloAnalyzer(game, seed=seed, workers=workers, analysis=self._analysis)
         self.current_algorithm = None
+        self.last_move_source = None
+        self._pending = deque()
+        self._pending_moves = {}
+        game.subscribe(self._on_change)
+
+    def make_moves(self):
+        moves = self._drain_pending()
+        if moves:
+            self.last_move_source = "queue"
+            instrumentation.count("moves", len(moves), source="queue")
+            return moves
+
+        self.last_move_source = "computed"
+        instrumentation.count("moves", source="computed")
+        move = self._compute_move()
+        return [move] + self._drain_pending() if move else []
+
+    def is_valid_move(self, move):
+        action, row, col = move
+        return not self.game.revealed[row][col] and not self.game.flags[row][col]
 
     def make_move(self):
-        move = self._neighbour_deduction.find_move()
+        move = self._next_pending()
         if move:
-            self.current_algorithm = "Neighbour Deduction"
-            action, row, col = move
-            print(f"AI znalazło ruch dedukcyjny ({self.current_algorithm}).")
-            return action, row, col
+            self.last_move_source = "queue"
+            instrumentation.count("moves", source="queue")
+            return move
+        self.last_move_source = "computed"
+        instrumentation.count("moves", source="computed")
+        return self._compute_move()
 
-        move = self._cluster_inference.analyze_clusters()
-        if move:
-            self.current_algorithm = "Cluster Inference"
-            action, row, col = move
-            print(f"AI znalazło ruch klastrowy ({self.current_algorithm}).")
-            return action, row, col
+    def _on_change(self, change):
+        if change.action == "restore":
+            self._pending.clear()
+            self._pending_moves.clear()
+            return
+        for cell in change.cells:
+            self._pending_moves.pop(cell, None)
+
+    def _queue(self, moves, algorithm):
+        for move in moves:
+            cell = (move[1], move[2])
+            if cell not in self._pending_moves:
+                self._pending.append(cell)
+            self._pending_moves[cell] = (move, algorithm)
+
+    def _next_pending(self):
+        while self._pending:
+            queued = self._pending_moves.pop(self._pending.popleft(), None)
+            if queued and self.is_valid_move(queued[0]):
+                move, self.current_algorithm = queued
+                return move
+        return None
+
+    def _drain_pending(self):
+        moves = []
+        move = self._next_pending()
+        while move:
+            moves.append(move)
+            move = self._next_pending()
+        return moves
+
+    def _compute_move(self):
+        with instrumentation.timed("move_seconds"):
+            return self._run_strategies()
+
+    def _run_strategies(self):
+        with instrumentation.timed("strategy_seconds", strategy="Neighbour Deduction"):
+            moves = self._neighbour_deduction.find_moves()
+        if moves:
+            self._queue(moves, "Neighbour Deduction")
+            tracing.info("AI znalazło {} ruchów dedukcyjnych (Neighbour Deduction).", len(moves))
+            return self._next_pending()
+
+        with instrumentation.timed("strategy_seconds", strategy="Cluster Inference"):
+            moves = self._cluster_inference.find_moves()
+        if moves:
+            self._queue(moves, "Cluster Inference")
+            tracing.info("AI znalazło {} ruchów klastrowych (Cluster Inference).", len(moves))
+            return self._next_pending()
 
-        move = self._Random_Forest_flagging.find_flag()
+        with instrumentation.timed("strategy_seconds", strategy="Random Forest"):
+            move = self._Random_Forest_flagging.find_flag()
         if move:
             self.current_algorithm = "Random Forest"
             row, col, prob = move
-            print(f"AI przewiduje pole ({row}, {col}) jako minę z prawdopodobieństwem {prob:.2f}.")
+            tracing.info("AI przewiduje pole ({}, {}) jako minę z prawdopodobieństwem {:.2f}.", row, col, prob)
             return 'flag', row, col
 
-        move = self._monte_carlo_analyzer.analyze()
+        with instrumentation.timed("strategy_seconds", strategy="Monte Carlo"):
+            if self._time_budget is None:
+                move = self._monte_carlo_analyzer.analyze()
+            else:
+                result = self._monte_carlo_analyzer.analyze_within(self._time_budget)
+                move = result.move if result else None
         if move:
             self.current_algorithm = "Monte Carlo"
             row, col = move
-            print(f"AI wybiera pole na podstawie Monte Carlo: ({row}, {col})")
+            tracing.info("AI wybiera pole na podstawie Monte Carlo: ({}, {})", row, col)
             return ('reveal', row, col)
 
     def get_current_algorithm(self):
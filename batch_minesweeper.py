@@ -0,0 +1,138 @@
+import numpy as np
+from minesweeper import Minesweeper, calculate_numbers
+
+
+def sample_mine_layouts(games, rows, cols, mines, rng=None, safe_cells=None):
+    rng = np.random.default_rng(rng)
+    if mines > rows * cols - (1 if safe_cells is not None else 0):
+        raise ValueError(f"Nie można rozmieścić {mines} min na planszy {rows}x{cols}.")
+    keys = rng.random((games, rows * cols))
+    if safe_cells is not None:
+        safe_rows, safe_cols = np.asarray(safe_cells).T
+        zone = np.zeros((games, rows, cols), dtype=bool)
+        index = np.arange(games)
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                r = np.clip(safe_rows + dr, 0, rows - 1)
+                c = np.clip(safe_cols + dc, 0, cols - 1)
+                zone[index, r, c] = True
+        free = rows * cols - zone.reshape(games, -1).sum(axis=1)
+        zone[free < mines] = False
+        zone[index, safe_rows, safe_cols] = True
+        keys[zone.reshape(games, -1)] += 2.0
+    layouts = np.zeros((games, rows * cols), dtype=bool)
+    if mines:
+        chosen = np.argpartition(keys, mines - 1, axis=1)[:, :mines]
+        np.put_along_axis(layouts, chosen, True, axis=1)
+    return layouts.reshape(games, rows, cols)
+
+
+class BatchMinesweeper:
+    def __init__(self, games, rows, cols, mines, seed=None, first_click_safe=False, layouts=None):
+        self.games = games
+        self.rows = rows
+        self.cols = cols
+        self.mines = mines
+        self.board = np.zeros((games, rows, cols), dtype=np.int8)
+        self.revealed = np.zeros((games, rows, cols), dtype=bool)
+        self.flags = np.zeros((games, rows, cols), dtype=bool)
+        self.won = np.zeros(games, dtype=bool)
+        self.lost = np.zeros(games, dtype=bool)
+        self._rng = np.random.default_rng(seed)
+        self._mines_placed = False
+        if layouts is not None:
+            self._place_mines(np.asarray(layouts, dtype=bool))
+        elif not first_click_safe:
+            self._place_mines(sample_mine_layouts(games, rows, cols, mines, self._rng))
+        self._hidden_safe = np.full(games, rows * cols - mines, dtype=np.int64)
+
+    def _place_mines(self, layouts):
+        self.board[...] = calculate_numbers(layouts)
+        self._mines_placed = True
+
+    @property
+    def active(self):
+        return ~(self.won | self.lost)
+
+    def reveal(self, rows, cols, mask=None):
+        rows = np.broadcast_to(np.asarray(rows), (self.games,))
+        cols = np.broadcast_to(np.asarray(cols), (self.games,))
+        if not self._mines_placed:
+            safe_cells = np.stack([rows, cols], axis=1)
+            self._place_mines(sample_mine_layouts(self.games, self.rows, self.cols, self.mines, self._rng, safe_cells))
+
+        index = np.arange(self.games)
+        move = self.active if mask is None else self.active & np.asarray(mask, dtype=bool)
+        move &= ~self.revealed[index, rows, cols] & ~self.flags[index, rows, cols]
+        results = np.full(self.games, "", dtype="<U9")
+
+        games = index[move]
+        self.revealed[games, rows[move], cols[move]] = True
+        values = self.board[games, rows[move], cols[move]]
+        hit = values == -1
+        self.lost[games[hit]] = True
+        results[games[hit]] = "game_over"
+
+        safe_games = games[~hit]
+        self._hidden_safe[safe_games] -= 1
+        seeds = np.zeros_like(self.revealed)
+        zero = values[~hit] == 0
+        seeds[safe_games[zero], rows[move][~hit][zero], cols[move][~hit][zero]] = True
+        self._flood_fill(seeds)
+
+        won = np.zeros(self.games, dtype=bool)
+        won[safe_games] = self._hidden_safe[safe_games] == 0
+        self.won |= won
+        results[safe_games] = np.where(won[safe_games], "win", "safe")
+        return results
+
+    def flag(self, rows, cols, mask=None):
+        rows = np.broadcast_to(np.asarray(rows), (self.games,))
+        cols = np.broadcast_to(np.asarray(cols), (self.games,))
+        index = np.arange(self.games)
+        move = self.active if mask is None else self.active & np.asarray(mask, dtype=bool)
+        move &= ~self.revealed[index, rows, cols]
+        self.flags[index[move], rows[move], cols[move]] ^= True
+        return move
+
+    def _flood_fill(self, seeds):
+        boards = np.flatnonzero(seeds.any(axis=(1, 2)))
+        seeds = seeds[boards]
+        closed = self.revealed[boards] | self.flags[boards]
+        zeros = self.board[boards] == 0
+        opened = np.zeros_like(seeds)
+        while boards.size:
+            spread = self._dilate(seeds) & ~closed
+            closed |= spread
+            opened |= spread
+            seeds = spread & zeros
+            spreading = seeds.any(axis=(1, 2))
+            if not spreading.all():
+                self._commit_flood(boards[~spreading], opened[~spreading])
+                boards, seeds, closed, zeros, opened = (
+                    boards[spreading], seeds[spreading], closed[spreading], zeros[spreading], opened[spreading]
+                )
+
+    def _commit_flood(self, boards, opened):
+        self.revealed[boards] |= opened
+        self._hidden_safe[boards] -= opened.reshape(boards.size, -1).sum(axis=1)
+
+    def _dilate(self, cells):
+        spread = cells.copy()
+        spread[:, 1:, :] |= cells[:, :-1, :]
+        spread[:, :-1, :] |= cells[:, 1:, :]
+        rows = spread.copy()
+        spread[:, :, 1:] |= rows[:, :, :-1]
+        spread[:, :, :-1] |= rows[:, :, 1:]
+        return spread
+
+    def game(self, index):
+        if not self._mines_placed:
+            game = Minesweeper(self.rows, self.cols, self.mines, seed=self._rng, first_click_safe=True)
+            game.flags_array[...] = self.flags[index]
+            return game
+        game = Minesweeper.from_layout(self.board[index] == -1)
+        game.revealed_array[...] = self.revealed[index]
+        game.flags_array[...] = self.flags[index]
+        game._hidden_safe = int(self._hidden_safe[index])
+        return game
@@ -0,0 +1,200 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import numpy as np
+from headless_runner import play_game, ALGORITHM_COLUMNS
+from minesweeper import Minesweeper
+from monte_carlo_analyzer import sampling_error
+import instrumentation
+
+PRESETS = {
+    "10x10": (10, 10, 10, 40),
+    "25x25": (25, 25, 100, 10),
+    "25x40": (25, 40, 100, 10),
+}
+STRESS_PRESETS = {
+    "50x50": (50, 50, 400, 3),
+    "60x100": (60, 100, 900, 2),
+}
+ALL_PRESETS = {**PRESETS, **STRESS_PRESETS}
+SUITES = {
+    "quick": list(PRESETS),
+    "full": list(PRESETS) + list(STRESS_PRESETS),
+}
+PERCENTILES = (50, 90, 99)
+SAMPLER_BOARD = (8, 8, 10, 3)
+
+
+def _percentiles(values):
+    values = np.asarray(values, dtype=float)
+    summary = {f"p{q}": round(float(np.percentile(values, q)), 4) for q in PERCENTILES}
+    summary["max"] = round(float(values.max()), 4)
+    summary["count"] = int(len(values))
+    return summary
+
+
+def run_preset(rows, cols, mines, games, seed=0, time_budget=None):
+    sources = ("queue", "computed")
+    first_sample = {
+        strategy: len(instrumentation.samples("strategy_seconds", strategy=strategy)) for strategy in ALGORITHM_COLUMNS
+    }
+    first_count = {source: instrumentation.value("moves", source=source) for source in sources}
+    game_seconds = []
+    results = []
+    for game_seed in range(seed, seed + games):
+        start = time.perf_counter()
+        summary, _ = play_game(game_seed, rows, cols, mines, time_budget=time_budget)
+        game_seconds.append(time.perf_counter() - start)
+        results.append(summary["Result"])
+
+    timings = {
+        strategy: instrumentation.samples("strategy_seconds", strategy=strategy)[first_sample[strategy]:]
+        for strategy in ALGORITHM_COLUMNS
+    }
+    wins = results.count("Win")
+    return {
+        "board": f"{rows}x{cols}",
+        "mines": mines,
+        "games": games,
+        "seeds": [seed, seed + games - 1],
+        "wins": wins,
+        "win_rate": round(wins / games, 4) if games else 0.0,
+        "stuck": results.count("Stuck"),
+        "game_seconds": {**_percentiles(game_seconds), "mean": round(float(np.mean(game_seconds)), 4)},
+        "moves": {source: instrumentation.value("moves", source=source) - first_count[source] for source in sources},
+        "latency_ms": {
+            strategy: _percentiles(np.asarray(samples) * 1000) for strategy, samples in sorted(timings.items()) if samples
+        },
+    }
+
+
+def run_sampler_check(seed=0, boards=12):
+    rows, cols, mines, reveals = SAMPLER_BOARD
+    errors = []
+    for board_seed in range(seed, seed + boards):
+        game = Minesweeper(rows, cols, mines, seed=board_seed)
+        rng = np.random.default_rng(board_seed)
+        safe = np.argwhere(game.board_array >= 0)
+        for row, col in safe[rng.choice(len(safe), reveals, replace=False)]:
+            if not game.revealed_array[row, col]:
+                game.reveal(int(row), int(col))
+        error = sampling_error(game, seed=board_seed)
+        if error is not None:
+            errors.append(error)
+    return {"boards": len(errors), "max_error": round(max(errors), 4) if errors else 0.0}
+
+
+def run_suite(presets, seed=0, games=None, time_budget=None, warmup=True):
+    if warmup:
+        play_game(seed, 10, 10, 10, time_budget=time_budget)
+        instrumentation.reset()
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "presets": {},
+    }
+    for name in presets:
+        rows, cols, mines, preset_games = ALL_PRESETS[name]
+        print(f"Benchmark {name}: {games or preset_games} gier...")
+        report["presets"][name] = run_preset(rows, cols, mines, games or preset_games, seed, time_budget)
+        preset = report["presets"][name]
+        print(f"  wygrane: {preset['win_rate']:.1%}, średni czas gry: {preset['game_seconds']['mean']:.3f} s")
+    report["sampler"] = run_sampler_check(seed)
+    print(f"Próbkowanie Monte Carlo a rachunek dokładny: maks. błąd {report['sampler']['max_error']:.3f}")
+    return report
+
+
+def compare_reports(report, baseline, latency_tolerance=0.5, time_tolerance=0.25,
+                    win_rate_tolerance=0.05, latency_floor_ms=1.0, time_floor_seconds=0.05, sampler_tolerance=0.05):
+    regressions = []
+    sampler = report.get("sampler")
+    if sampler and sampler["max_error"] > sampler_tolerance:
+        regressions.append(
+            f"próbkowanie Monte Carlo: błąd {sampler['max_error']:.3f} względem rachunku dokładnego > {sampler_tolerance:.3f}"
+        )
+    for name, preset in report["presets"].items():
+        previous = baseline.get("presets", {}).get(name)
+        if previous is None:
+            continue
+        if previous["games"] != preset["games"] or previous["seeds"] != preset["seeds"]:
+            print(f"{name}: inny zestaw gier niż we wzorcu, pomijam porównanie.")
+            continue
+
+        if preset["win_rate"] < previous["win_rate"] - win_rate_tolerance:
+            regressions.append(
+                f"{name}: skuteczność {preset['win_rate']:.1%} < wzorzec {previous['win_rate']:.1%}"
+            )
+
+        mean, previous_mean = preset["game_seconds"]["mean"], previous["game_seconds"]["mean"]
+        if mean > max(previous_mean * (1 + time_tolerance), previous_mean + time_floor_seconds):
+            regressions.append(f"{name}: średni czas gry {mean:.3f} s > wzorzec {previous_mean:.3f} s")
+
+        for algorithm, latency in preset["latency_ms"].items():
+            previous_latency = previous["latency_ms"].get(algorithm)
+            if previous_latency is None:
+                continue
+            for key in ("p50", "p90"):
+                limit = max(previous_latency[key] * (1 + latency_tolerance), previous_latency[key] + latency_floor_ms)
+                if latency[key] > limit:
+                    regressions.append(
+                        f"{name}/{algorithm}: opóźnienie {key} {latency[key]:.2f} ms > wzorzec "
+                        f"{previous_latency[key]:.2f} ms"
+                    )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Powtarzalny benchmark strategii AI.")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument("--preset", action="append", choices=list(ALL_PRESETS))
+    parser.add_argument("--games", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-budget", type=float, default=None)
+    parser.add_argument("--output", default="benchmark_report.json")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--latency-tolerance", type=float, default=0.5)
+    parser.add_argument("--time-tolerance", type=float, default=0.25)
+    parser.add_argument("--win-rate-tolerance", type=float, default=0.05)
+    parser.add_argument("--sampler-tolerance", type=float, default=0.05)
+    parser.add_argument("--metrics", default=None, help="plik .json lub .prom z metrykami strategii")
+    args = parser.parse_args(argv)
+
+    instrumentation.enable(samples=True)
+    report = run_suite(args.preset or SUITES[args.suite], args.seed, args.games, args.time_budget)
+    if args.metrics:
+        if args.metrics.endswith(".prom"):
+            instrumentation.dump_prometheus(args.metrics)
+        else:
+            instrumentation.dump_json(args.metrics)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Raport zapisany do pliku: {args.output}")
+
+    if not args.baseline:
+        return 0
+    try:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    except Exception as e:
+        print(f"Błąd podczas wczytywania wzorca: {e}")
+        return 2
+
+    regressions = compare_reports(
+        report, baseline, args.latency_tolerance, args.time_tolerance, args.win_rate_tolerance,
+        sampler_tolerance=args.sampler_tolerance,
+    )
+    for regression in regressions:
+        print(f"REGRESJA: {regression}")
+    if regressions:
+        return 1
+    print("Brak regresji względem wzorca.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+import numpy as np
+from constraint_solver import DisjointSet
+import instrumentation
+
+HIDDEN = -3
+FLAGGED = -2
+OUTSIDE = -4
+
+
+class BoardAnalysis:
+    def __init__(self, game):
+        self.game = game
+        self.version = 0
+        self._neighbours = [
+            [self._neighbour_list(row, col) for col in range(game.cols)] for row in range(game.rows)
+        ]
+        self._padded = np.full((game.rows + 2, game.cols + 2), OUTSIDE, dtype=np.int8)
+        self.windows = np.lib.stride_tricks.sliding_window_view(self._padded, (3, 3))
+        self.hidden = set()
+        self.frontier = set()
+        self._sources = set()
+        self._component_of = {}
+        self._components = {}
+        self._next_component = 0
+        self._dirty_sources = set()
+        self._dirty_components = set()
+        self._cached = {}
+        self._rebuild()
+        game.subscribe(self._on_change)
+
+    def neighbours(self, row, col):
+        return self._neighbours[row][col]
+
+    def features(self, mask=None):
+        if mask is None:
+            return self.windows.reshape(self.game.rows, self.game.cols, 9)
+        return self.windows[mask].reshape(-1, 9)
+
+    def hidden_cells(self):
+        return self._per_version("hidden_cells", lambda: sorted(self.hidden))
+
+    def constraints(self):
+        cells, constraints, _ = self._per_version("constraints", self._build_constraints)
+        return cells, constraints
+
+    def components(self):
+        return self._per_version("components", self._build_components)
+
+    def _build_constraints(self):
+        revealed = self.game.revealed_array
+        flags = self.game.flags_array
+        cells = []
+        index = {}
+        constraints = []
+        by_source = {}
+        for row, col in sorted(self._sources):
+            mask = 0
+            mines = int(self.game.board_array[row, col])
+            for cell in self._neighbours[row][col]:
+                if flags[cell]:
+                    mines -= 1
+                elif not revealed[cell]:
+                    if cell not in index:
+                        index[cell] = len(cells)
+                        cells.append(cell)
+                    mask |= 1 << index[cell]
+            constraints.append((mask, mines))
+            by_source[(row, col)] = constraints[-1]
+        return cells, constraints, by_source
+
+    def _build_components(self):
+        self._sync_components()
+        _, _, by_source = self._per_version("constraints", self._build_constraints)
+        return [
+            [by_source[source] for source in sorted(sources)]
+            for sources in sorted(self._components.values(), key=min)
+        ]
+
+    def _sync_components(self):
+        dirty = {source for source in self._dirty_sources if source in self._sources}
+        for component in self._dirty_components:
+            for source in self._components.pop(component):
+                del self._component_of[source]
+                if source in self._sources:
+                    dirty.add(source)
+        self._dirty_sources.clear()
+        self._dirty_components.clear()
+
+        groups = DisjointSet()
+        for source in dirty:
+            groups.add(source)
+            for cell in self._hidden_neighbours(source):
+                for other in self._neighbours[cell[0]][cell[1]]:
+                    if other in dirty:
+                        node = other
+                    elif other in self._component_of:
+                        node = self._component_of[other]
+                    else:
+                        continue
+                    groups.add(node)
+                    groups.union(source, node)
+
+        for group in groups.groups():
+            sources = set()
+            for node in group:
+                if node in self._components:
+                    sources |= self._components.pop(node)
+                else:
+                    sources.add(node)
+            component = self._next_component
+            self._next_component += 1
+            self._components[component] = sources
+            for source in sources:
+                self._component_of[source] = component
+
+    def _hidden_neighbours(self, cell):
+        revealed = self.game.revealed_array
+        flags = self.game.flags_array
+        return [n for n in self._neighbours[cell[0]][cell[1]] if not revealed[n] and not flags[n]]
+
+    def _per_version(self, key, compute):
+        version, value = self._cached.get(key, (None, None))
+        if version != self.version:
+            instrumentation.cache("analysis_cache", misses=1)
+            value = compute()
+            self._cached[key] = (self.version, value)
+        else:
+            instrumentation.cache("analysis_cache", hits=1)
+        return value
+
+    def _neighbour_list(self, row, col):
+        return [
+            (r, c)
+            for r in range(max(row - 1, 0), min(row + 2, self.game.rows))
+            for c in range(max(col - 1, 0), min(col + 2, self.game.cols))
+            if (r, c) != (row, col)
+        ]
+
+    def _rebuild(self):
+        revealed = self.game.revealed_array
+        flags = self.game.flags_array
+        self._padded[1:-1, 1:-1] = np.where(revealed, self.game.board_array, np.where(flags, FLAGGED, HIDDEN))
+        hidden = ~revealed & ~flags
+        self.hidden = {(int(r), int(c)) for r, c in zip(*np.nonzero(hidden))}
+        has_hidden = (self.windows != np.int8(HIDDEN)) & (self.windows != np.int8(FLAGGED))
+        has_hidden = ~has_hidden.all(axis=(2, 3))
+        frontier = revealed & (self.game.board_array >= 0) & has_hidden
+        self.frontier = {(int(r), int(c)) for r, c in zip(*np.nonzero(frontier))}
+        self._sources = {cell for cell in self.frontier if self._hidden_neighbours(cell)}
+        self._component_of.clear()
+        self._components.clear()
+        self._dirty_sources = set(self._sources)
+        self._dirty_components.clear()
+        self.version += 1
+
+    def _on_change(self, change):
+        touched = set()
+        for row, col in change.cells:
+            self._encode(row, col)
+            touched.add((row, col))
+            touched.update(self._neighbours[row][col])
+        for cell in touched:
+            self._refresh_frontier(cell)
+            self._refresh_source(cell)
+        self.version += 1
+
+    def _encode(self, row, col):
+        if self.game.revealed_array[row, col]:
+            value = self.game.board_array[row, col]
+            self.hidden.discard((row, col))
+        elif self.game.flags_array[row, col]:
+            value = FLAGGED
+            self.hidden.discard((row, col))
+        else:
+            value = HIDDEN
+            self.hidden.add((row, col))
+        self._padded[row + 1, col + 1] = value
+
+    def _refresh_frontier(self, cell):
+        row, col = cell
+        revealed = self.game.revealed_array
+        if (
+            revealed[row, col]
+            and self.game.board_array[row, col] >= 0
+            and any(not revealed[n] for n in self._neighbours[row][col])
+        ):
+            self.frontier.add(cell)
+        else:
+            self.frontier.discard(cell)
+
+    def _refresh_source(self, cell):
+        if cell in self._component_of:
+            self._dirty_components.add(self._component_of[cell])
+        if cell in self.frontier and self._hidden_neighbours(cell):
+            self._sources.add(cell)
+            if cell not in self._component_of:
+                self._dirty_sources.add(cell)
+        else:
+            self._sources.discard(cell)
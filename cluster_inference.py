@@ -1,69 +1,134 @@
+from collections import deque
+from constraint_solver import propagate, cells_in
+from board_analysis import BoardAnalysis
+import instrumentation
+
+
 class ClusterInference:
-    def __init__(self, game):
+    def __init__(self, game, analysis=None):
         self.game = game
+        self._analysis = analysis or BoardAnalysis(game)
+        self._region_of = {}
+        self._regions = {}
+        self._next_region = 0
+        self._pending = set()
+        self._rebuild_regions()
+        game.subscribe(self._on_change)
 
     def find_clusters(self):
-        clusters = []
-        visited = set()
+        if self._pending:
+            self._sync_regions()
+        return [sorted(cells) for cells in sorted(self._regions.values(), key=min)]
 
+    def _rebuild_regions(self):
+        self._region_of.clear()
+        self._regions.clear()
         for row in range(self.game.rows):
             for col in range(self.game.cols):
-                if (row, col) not in visited and not self.game.revealed[row][col]:
-                    cluster = self._build_cluster(row, col, visited)
-                    if cluster:
-                        clusters.append(cluster)
-        return clusters
+                if (row, col) not in self._region_of and not self.game.revealed_array[row, col]:
+                    self._add_region(self._build_cluster(row, col))
 
-    def _build_cluster(self, row, col, visited):
-        cluster = []
-        queue = [(row, col)]
-        while queue:
-            r, c = queue.pop(0)
-            if (r, c) in visited or self.game.revealed[r][c]:
-                continue
-            visited.add((r, c))
-            cluster.append((r, c))
+    def _add_region(self, cells):
+        region = self._next_region
+        self._next_region += 1
+        self._regions[region] = cells
+        for cell in cells:
+            self._region_of[cell] = region
+        return region
 
-            neighbours = self._get_neighbours(r, c)
-            for n_r, n_c in neighbours:
-                if not self.game.revealed[n_r][n_c] and (n_r, n_c) not in visited:
-                    queue.append((n_r, n_c))
+    def _build_cluster(self, row, col, targets=None):
+        cluster = {(row, col)}
+        queue = deque([(row, col)])
+        remaining = set(targets) - cluster if targets else None
+        while queue:
+            r, c = queue.popleft()
+            for n in self._get_neighbours(r, c):
+                if n not in cluster and not self.game.revealed_array[n]:
+                    cluster.add(n)
+                    queue.append(n)
+                    if remaining is not None:
+                        remaining.discard(n)
+                        if not remaining:
+                            return None
         return cluster
 
-    def _get_neighbours(self, row, col):
-        neighbours = []
-        for r in range(row - 1, row + 2):
-            for c in range(col - 1, col + 2):
-                if (r == row and c == col) or not self._is_valid(r, c):
-                    continue
-                neighbours.append((r, c))
-        return neighbours
+    def _on_change(self, change):
+        if change.action != "flag":
+            self._pending.update(change.cells)
 
-    def _is_valid(self, row, col):
-        return 0 <= row < self.game.rows and 0 <= col < self.game.cols
+    def _sync_regions(self):
+        boundary = set()
+        hidden = []
+        for cell in sorted(self._pending):
+            if self.game.revealed_array[cell]:
+                region = self._region_of.pop(cell, None)
+                if region is not None:
+                    self._regions[region].discard(cell)
+                    if not self._regions[region]:
+                        del self._regions[region]
+                    boundary.update(
+                        n for n in self._get_neighbours(*cell) if not self.game.revealed_array[n]
+                    )
+            elif cell not in self._region_of:
+                hidden.append(cell)
+        self._pending.clear()
+        for cell in hidden:
+            self._merge_hidden(cell)
 
-    def analyze_clusters(self):
-        if not any(self.game.revealed[row][col] for row in range(self.game.rows) for col in range(self.game.cols)):
-            return None
+        by_region = {}
+        for cell in boundary:
+            if cell in self._region_of:
+                by_region.setdefault(self._region_of[cell], set()).add(cell)
+        for region, cells in by_region.items():
+            self._split_region(region, cells)
 
-        clusters = self.find_clusters()
-        for cluster in clusters:
-            for cell in cluster:
-                safe_moves, _ = self._analyze_cell(cell)
-                if safe_moves:
-                    return ('reveal', safe_moves[0][0], safe_moves[0][1])
-        return None
+    def _merge_hidden(self, cell):
+        regions = {self._region_of[n] for n in self._get_neighbours(*cell) if n in self._region_of}
+        if not regions:
+            self._add_region({cell})
+            return
+        target = max(regions, key=lambda region: len(self._regions[region]))
+        self._regions[target].add(cell)
+        self._region_of[cell] = target
+        for region in regions - {target}:
+            moved = self._regions.pop(region)
+            for other in moved:
+                self._region_of[other] = target
+            self._regions[target] |= moved
 
-    def _analyze_cell(self, cell):
-        row, col = cell
-        neighbours = self._get_neighbours(row, col)
+    def _split_region(self, region, boundary):
+        while len(boundary) > 1:
+            start = min(boundary)
+            part = self._build_cluster(*start, targets=boundary)
+            if part is None:
+                return
+            self._regions[region] -= part
+            self._add_region(part)
+            boundary -= part
 
-        mine_count = sum(1 for r, c in neighbours if self.game.board[r][c] == -1)
-        flagged_count = sum(1 for r, c in neighbours if self.game.flags[r][c])
+    def _get_neighbours(self, row, col):
+        return self._analysis.neighbours(row, col)
 
-        safe_moves = []
+    def analyze_clusters(self):
+        moves = self.find_moves()
+        if moves:
+            return moves[0]
+        return None
 
-        if flagged_count == mine_count:
-            safe_moves = [(r, c) for r, c in neighbours if not self.game.revealed[r][c] and not self.game.flags[r][c]]
+    def find_moves(self):
+        if not self.game.revealed_array.any():
+            return []
 
-        return safe_moves, []
+        cells, _ = self._analysis.constraints()
+        instrumentation.count("cells_scanned", len(cells), strategy="Cluster Inference")
+        safe, mines = 0, 0
+        for component in self._analysis.components():
+            solved = propagate(component)
+            if solved is None:
+                continue
+            safe |= solved[0]
+            mines |= solved[1]
+        return (
+            [('reveal', r, c) for r, c in sorted(cells_in(safe, cells))]
+            + [('flag', r, c) for r, c in sorted(cells_in(mines, cells))]
+        )
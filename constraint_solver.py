@@ -0,0 +1,205 @@
+from collections import deque
+import time
+import numpy as np
+
+
+def build_constraints(game):
+    revealed = game.revealed_array
+    hidden = ~revealed & ~game.flags_array
+    padded = np.pad(hidden, 1)
+    borders_hidden = np.zeros_like(hidden)
+    for dr in range(3):
+        for dc in range(3):
+            borders_hidden |= padded[dr:dr + game.rows, dc:dc + game.cols]
+    sources = revealed & (game.board_array >= 0) & borders_hidden
+
+    cells = []
+    index = {}
+    constraints = []
+    for row, col in zip(*np.nonzero(sources)):
+        row, col = int(row), int(col)
+        mask = 0
+        mines = int(game.board_array[row, col])
+        for r in range(max(row - 1, 0), min(row + 2, game.rows)):
+            for c in range(max(col - 1, 0), min(col + 2, game.cols)):
+                if game.flags_array[r, c]:
+                    mines -= 1
+                elif hidden[r, c]:
+                    if (r, c) not in index:
+                        index[(r, c)] = len(cells)
+                        cells.append((r, c))
+                    mask |= 1 << index[(r, c)]
+        constraints.append((mask, mines))
+    return cells, constraints
+
+
+class DisjointSet:
+    def __init__(self):
+        self._parent = {}
+        self._size = {}
+
+    def add(self, item):
+        if item not in self._parent:
+            self._parent[item] = item
+            self._size[item] = 1
+
+    def find(self, item):
+        root = item
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[item] != root:
+            self._parent[item], item = root, self._parent[item]
+        return root
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self._size[a] < self._size[b]:
+            a, b = b, a
+        self._parent[b] = a
+        self._size[a] += self._size[b]
+        return a
+
+    def groups(self):
+        groups = {}
+        for item in self._parent:
+            groups.setdefault(self.find(item), []).append(item)
+        return list(groups.values())
+
+
+def split_components(constraints):
+    components = DisjointSet()
+    for mask, _ in constraints:
+        if not mask:
+            continue
+        low = mask & -mask
+        components.add(low)
+        bits = mask ^ low
+        while bits:
+            bit = bits & -bits
+            components.add(bit)
+            components.union(low, bit)
+            bits ^= bit
+
+    grouped = {}
+    for constraint in constraints:
+        mask = constraint[0]
+        if mask:
+            grouped.setdefault(components.find(mask & -mask), []).append(constraint)
+    return list(grouped.values())
+
+
+def propagate(constraints, deadline=None):
+    pending = set(constraints)
+    safe = 0
+    mines = 0
+
+    while True:
+        reduced = set()
+        for mask, count in pending:
+            count -= _popcount(mask & mines)
+            mask &= ~(safe | mines)
+            if count < 0 or count > _popcount(mask):
+                return None
+            if mask:
+                reduced.add((mask, count))
+        if deadline is not None and time.perf_counter() >= deadline:
+            return safe, mines, reduced
+
+        new_safe, new_mines = 0, 0
+        for mask, count in reduced:
+            if count == 0:
+                new_safe |= mask
+            elif count == _popcount(mask):
+                new_mines |= mask
+        if new_safe & new_mines:
+            return None
+        if new_safe or new_mines:
+            safe |= new_safe
+            mines |= new_mines
+            pending = reduced
+            continue
+
+        derived = _pairwise_rules(reduced)
+        if derived is None:
+            return None
+        derived_safe, derived_mines, derived_constraints = derived
+        if derived_safe & derived_mines:
+            return None
+        if not derived_safe and not derived_mines and derived_constraints <= reduced:
+            return safe, mines, reduced
+        safe |= derived_safe
+        mines |= derived_mines
+        pending = reduced | derived_constraints
+
+
+def _pairwise_rules(constraints):
+    by_bit = {}
+    ordered = list(constraints)
+    for i, (mask, _) in enumerate(ordered):
+        bits = mask
+        while bits:
+            low = bits & -bits
+            by_bit.setdefault(low, []).append(i)
+            bits ^= low
+
+    safe, mines = 0, 0
+    derived = set()
+    for i, (mask_a, count_a) in enumerate(ordered):
+        neighbours = set()
+        bits = mask_a
+        while bits:
+            low = bits & -bits
+            neighbours.update(by_bit[low])
+            bits ^= low
+        for j in neighbours:
+            if j == i:
+                continue
+            mask_b, count_b = ordered[j]
+            only_b = mask_b & ~mask_a
+            only_a = mask_a & ~mask_b
+            if not only_a:
+                if count_b - count_a < 0:
+                    return None
+                derived.add((only_b, count_b - count_a))
+            elif count_b - count_a == _popcount(only_b):
+                mines |= only_b
+                safe |= only_a
+    return safe, mines, derived
+
+
+def constraint_order(size, constraints, cell_constraints):
+    order = []
+    seen = set()
+    for start in range(size):
+        if start in seen:
+            continue
+        queue = deque([start])
+        seen.add(start)
+        while queue:
+            cell = queue.popleft()
+            order.append(cell)
+            for index in cell_constraints[cell]:
+                for other in constraints[index][0]:
+                    if other not in seen:
+                        seen.add(other)
+                        queue.append(other)
+    return order
+
+
+if hasattr(int, "bit_count"):
+    def _popcount(mask):
+        return mask.bit_count()
+else:
+    def _popcount(mask):
+        return bin(mask).count("1")
+
+
+def cells_in(mask, cells):
+    found = []
+    while mask:
+        low = mask & -mask
+        found.append(cells[low.bit_length() - 1])
+        mask ^= low
+    return found
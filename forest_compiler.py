@@ -0,0 +1,118 @@
+import os
+import joblib
+import numpy as np
+
+
+class CompiledForest:
+    def __init__(self, feature, threshold, left, right, value, roots, classes, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.n_features_in_ = int(n_features)
+
+    def predict_proba(self, features):
+        features = np.asarray(features, dtype=np.float32).reshape(-1, self.n_features_in_)
+        flat = features.ravel()
+        trees = len(self.roots)
+        offsets = np.repeat(np.arange(len(features), dtype=np.int64) * self.n_features_in_, trees)
+        nodes = np.tile(self.roots, len(features))
+        active = np.arange(len(nodes))
+        while active.size:
+            current = nodes[active]
+            go_left = flat[offsets[active] + self.feature[current]] <= self.threshold[current]
+            following = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = following
+            active = active[following != current]
+        return self.value[nodes].reshape(len(features), trees, -1).mean(axis=1)
+
+    def arrays(self):
+        return {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "left": self.left,
+            "right": self.right,
+            "value": self.value,
+            "roots": self.roots,
+            "classes": self.classes_,
+            "n_features": np.int64(self.n_features_in_),
+        }
+
+
+def compile_forest(model):
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        index = np.arange(tree.node_count, dtype=np.int32) + offset
+        leaf = tree.children_left == -1
+        value = np.asarray(tree.value)[:, 0, :]
+        totals = value.sum(axis=1, keepdims=True)
+
+        features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.asarray(tree.threshold, dtype=np.float64))
+        lefts.append(np.where(leaf, index, tree.children_left + offset).astype(np.int32))
+        rights.append(np.where(leaf, index, tree.children_right + offset).astype(np.int32))
+        values.append(np.divide(value, totals, out=np.zeros_like(value), where=totals > 0))
+        roots.append(offset)
+        offset += tree.node_count
+
+    return CompiledForest(
+        np.concatenate(features),
+        np.concatenate(thresholds),
+        np.concatenate(lefts),
+        np.concatenate(rights),
+        np.concatenate(values),
+        np.array(roots, dtype=np.int32),
+        np.asarray(model.classes_),
+        model.n_features_in_,
+    )
+
+
+def compiled_path(model_path):
+    return os.path.splitext(model_path)[0] + ".compiled.joblib"
+
+
+def save_compiled(forest, model_path):
+    temporary = f"{compiled_path(model_path)}.{os.getpid()}.tmp"
+    try:
+        joblib.dump(forest.arrays(), temporary)
+        os.replace(temporary, compiled_path(model_path))
+        print(f"Skompilowany las zapisany do pliku: {compiled_path(model_path)}")
+    except Exception as e:
+        print(f"Błąd podczas zapisywania skompilowanego lasu: {e}")
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def load_compiled(model_path):
+    path = compiled_path(model_path)
+    if not os.path.exists(path):
+        return None
+    if os.path.exists(model_path) and os.path.getmtime(path) < os.path.getmtime(model_path):
+        return None
+    try:
+        arrays = joblib.load(path, mmap_mode="r")
+        return CompiledForest(
+            arrays["feature"], arrays["threshold"], arrays["left"], arrays["right"],
+            arrays["value"], arrays["roots"], arrays["classes"], arrays["n_features"],
+        )
+    except Exception as e:
+        print(f"Błąd podczas wczytywania skompilowanego lasu: {e}")
+        return None
+
+
+def verify_equivalence(model, forest, features=None, samples=4096, seed=0, atol=1e-9):
+    if features is None:
+        features = np.random.default_rng(seed).integers(-4, 9, size=(samples, model.n_features_in_))
+    expected = model.predict_proba(features)
+    actual = forest.predict_proba(features)
+    difference = float(np.max(np.abs(expected - actual))) if len(features) else 0.0
+    if difference > atol:
+        print(f"Skompilowany las różni się od modelu (maksymalna różnica {difference:.2e}).")
+        return False
+    return True
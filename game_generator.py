@@ -52,7 +52,7 @@ class GameGeneratorMinesweeperGUI(QMainWindow):
             elif result == "win":
                 self._show_win_message()
             else:
-                self._update_board()
+                self._update_cells(self.game.last_change.cells)
         except Exception as e:
             print(f"Error in on_click: {e}")
 
@@ -60,28 +60,30 @@ class GameGeneratorMinesweeperGUI(QMainWindow):
         try:
             self.game.flag(row, col)
             self._logger.log_move("flag", row, col, "AI_flagged", self.game)
-            self._update_board()
+            self._update_cells(self.game.last_change.cells)
         except Exception as e:
             print(f"Error in on_right_click: {e}")
 
     def _update_board(self):
+        self._update_cells((row, col) for row in range(self.game.rows) for col in range(self.game.cols))
+
+    def _update_cells(self, cells):
         try:
-            for row in range(self.game.rows):
-                for col in range(self.game.cols):
-                    button = self._buttons[(row, col)]
-                    if self.game.flags[row][col]:
-                        button.setText("F")
-                        button.setStyleSheet("color: red; background-color: gray;")
-                    elif self.game.revealed[row][col]:
-                        if self.game.board[row][col] == -1:
-                            button.setText("*")
-                            button.setStyleSheet("color: black; background-color: darkgray;")
-                        else:
-                            button.setText(str(self.game.board[row][col]) if self.game.board[row][col] > 0 else " ")
-                            button.setStyleSheet("color: blue; background-color: darkgray;")
+            for row, col in cells:
+                button = self._buttons[(row, col)]
+                if self.game.flags[row][col]:
+                    button.setText("F")
+                    button.setStyleSheet("color: red; background-color: gray;")
+                elif self.game.revealed[row][col]:
+                    if self.game.board[row][col] == -1:
+                        button.setText("*")
+                        button.setStyleSheet("color: black; background-color: darkgray;")
                     else:
-                        button.setText(" ")
-                        button.setStyleSheet("background-color: gray;")
+                        button.setText(str(self.game.board[row][col]) if self.game.board[row][col] > 0 else " ")
+                        button.setStyleSheet("color: blue; background-color: darkgray;")
+                else:
+                    button.setText(" ")
+                    button.setStyleSheet("background-color: gray;")
         except Exception as e:
             print(f"Error in update_board: {e}")
 
@@ -115,17 +117,23 @@ class GameGeneratorMinesweeperGUI(QMainWindow):
 
     def _play_ai_move(self):
         try:
-            move = self.ai_player.make_move()
-            if move:
-                action, row, col = move
+            game = self.game
+            moves = self.ai_player.make_moves()
+            if moves:
                 algorithm = self.ai_player.get_current_algorithm()
-                self._results_logger.log_move(algorithm)
-                if action == 'reveal':
-                    print(f"AI odkrywa: {row}, {col}")
-                    self._on_click(row, col)
-                elif action == 'flag':
-                    print(f"AI flaguje: {row}, {col}")
-                    self._on_right_click(row, col)
+                for move in moves:
+                    if self.game is not game or not self._timer.isActive():
+                        break
+                    if not self.ai_player.is_valid_move(move):
+                        continue
+                    action, row, col = move
+                    self._results_logger.log_move(algorithm)
+                    if action == 'reveal':
+                        print(f"AI odkrywa: {row}, {col}")
+                        self._on_click(row, col)
+                    elif action == 'flag':
+                        print(f"AI flaguje: {row}, {col}")
+                        self._on_right_click(row, col)
             else:
                 print("AI nie ma dostępnych ruchów.")
                 self._timer.stop()
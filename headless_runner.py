@@ -0,0 +1,150 @@
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from minesweeper import Minesweeper
+from ai_player import AIPlayer
+from GameLogger import GameLogger, get_adjacent_3x3
+import tracing
+import model_registry
+from train_forest import train_forest
+from monte_carlo_analyzer import shutdown_pools
+
+ALGORITHM_COLUMNS = {
+    "Neighbour Deduction": "NeighbourDeductionMoves",
+    "Cluster Inference": "ClusterInferenceMoves",
+    "Random Forest": "RandomForestMoves",
+    "Monte Carlo": "MonteCarloMoves",
+}
+
+
+def play_game(seed, rows, cols, mines, time_budget=None, first_click_safe=False, verbose=False, trace_dir=None):
+    tracing.configure(
+        console=tracing.INFO if verbose else tracing.OFF,
+        buffer=tracing.DEBUG if trace_dir else tracing.OFF,
+    )
+    tracing.clear()
+    with contextlib.ExitStack() as stack:
+        if not verbose:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        summary, moves = _play(seed, rows, cols, mines, time_budget, first_click_safe)
+    if trace_dir and summary["Result"] != "Win":
+        tracing.dump(os.path.join(trace_dir, f"trace_seed_{seed}.log"))
+    return summary, moves
+
+
+def _play(seed, rows, cols, mines, time_budget, first_click_safe):
+    start = time.perf_counter()
+    game = Minesweeper(rows, cols, mines, seed=seed, first_click_safe=first_click_safe)
+    ai_player = AIPlayer(game, seed=seed, time_budget=time_budget)
+    summary = {
+        "Seed": seed,
+        "Mines": mines,
+        "BoardSize": f"{rows}x{cols}",
+        "TotalMoves": 0,
+        "QueuedMoves": 0,
+        **{column: 0 for column in ALGORITHM_COLUMNS.values()},
+        "Result": None,
+        "LastAlgorithm": None,
+    }
+    moves = []
+    result = None
+
+    while result not in ("win", "game_over") and summary["TotalMoves"] < 2 * rows * cols:
+        move = ai_player.make_move()
+        if not move:
+            summary["Result"] = "Stuck"
+            break
+        action, row, col = move
+        algorithm = ai_player.get_current_algorithm()
+        summary["TotalMoves"] += 1
+        summary["QueuedMoves"] += ai_player.last_move_source == "queue"
+        summary["LastAlgorithm"] = algorithm
+        if algorithm in ALGORITHM_COLUMNS:
+            summary[ALGORITHM_COLUMNS[algorithm]] += 1
+
+        if action == 'reveal':
+            result = game.reveal(row, col)
+            logged = result
+        else:
+            game.flag(row, col)
+            logged = "AI_flagged"
+        moves.append((action, row, col, logged, get_adjacent_3x3(game, row, col)))
+
+    if result == "win":
+        summary["Result"] = "Win"
+    elif result == "game_over":
+        summary["Result"] = "Loss"
+    summary["Seconds"] = round(time.perf_counter() - start, 4)
+    return summary, moves
+
+
+def prepare_model(model_path="model.pkl", data_path='game_log_processed_data.csv'):
+    if model_registry.get_forest(model_path, lambda: train_forest(data_path, model_path)) is None:
+        print(f"Brak modelu {model_path} i nie udało się go wytrenować z danych {data_path}. Przerywam.")
+        return False
+    return True
+
+
+def run_games(games, rows, cols, mines, seed=0, workers=1, results_path="game_results.jsonl",
+              moves_path="game_log.csv", time_budget=None, first_click_safe=False, verbose=False, trace_dir=None):
+    if not prepare_model():
+        return None
+    game_id = int(GameLogger(moves_path).game_id) if moves_path else 0
+    seeds = range(seed, seed + games)
+    arguments = (seeds, repeat(rows), repeat(cols), repeat(mines), repeat(time_budget),
+                 repeat(first_click_safe), repeat(verbose), repeat(trace_dir))
+    if trace_dir:
+        os.makedirs(trace_dir, exist_ok=True)
+
+    wins = 0
+    with contextlib.ExitStack() as stack:
+        results_file = stack.enter_context(open(results_path, "a")) if results_path else None
+        moves_writer = csv.writer(stack.enter_context(open(moves_path, "a", newline=""))) if moves_path else None
+        if workers > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+            played = executor.map(play_game, *arguments)
+        else:
+            played = map(play_game, *arguments)
+
+        for summary, moves in played:
+            game_id += 1
+            summary = {"GameID": int(game_id), **summary}
+            wins += summary["Result"] == "Win"
+            if results_file:
+                results_file.write(json.dumps(summary) + "\n")
+                results_file.flush()
+            if moves_writer:
+                moves_writer.writerows((game_id,) + move for move in moves)
+            print(f"Gra {summary['GameID']} (ziarno {summary['Seed']}): {summary['Result']}, "
+                  f"ruchy: {summary['TotalMoves']}, czas: {summary['Seconds']:.2f} s")
+
+    shutdown_pools()
+    print(f"Rozegrano {games} gier, wygrane: {wins} ({wins / games:.1%})." if games else "Nie rozegrano żadnej gry.")
+    return wins
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rozgrywanie gier AI bez interfejsu graficznego.")
+    parser.add_argument("--games", type=int, default=98)
+    parser.add_argument("--rows", type=int, default=25)
+    parser.add_argument("--cols", type=int, default=40)
+    parser.add_argument("--mines", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0, help="pierwsze ziarno; kolejne gry dostają kolejne ziarna")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--results", default="game_results.jsonl")
+    parser.add_argument("--moves", default="game_log.csv")
+    parser.add_argument("--time-budget", type=float, default=None)
+    parser.add_argument("--first-click-safe", action="store_true")
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--trace-dir", default=None, help="katalog na ślady przegranych gier")
+    args = parser.parse_args()
+    wins = run_games(args.games, args.rows, args.cols, args.mines, args.seed, args.workers, args.results,
+                     args.moves, args.time_budget, args.first_click_safe, args.verbose, args.trace_dir)
+    if wins is None:
+        sys.exit(1)
@@ -0,0 +1,180 @@
+import json
+import time
+
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+PREFIX = "minesweeper_"
+
+enabled = False
+keep_samples = False
+_counters = {}
+_histograms = {}
+_samples = {}
+
+
+def enable(samples=False):
+    global enabled, keep_samples
+    enabled = True
+    keep_samples = samples
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    _counters.clear()
+    _histograms.clear()
+    _samples.clear()
+
+
+def count(name, value=1, **labels):
+    if not enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    if not enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    histogram = _histograms.get(key)
+    if histogram is None:
+        histogram = _histograms[key] = [0, 0.0, [0] * len(BUCKETS)]
+    if keep_samples:
+        _samples.setdefault(key, []).append(value)
+    histogram[0] += 1
+    histogram[1] += value
+    for index, bound in enumerate(BUCKETS):
+        if value <= bound:
+            histogram[2][index] += 1
+            break
+
+
+class _Timer:
+    def __init__(self, name, labels):
+        self._name = name
+        self._labels = labels
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self._name, time.perf_counter() - self._start, **self._labels)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(name, **labels):
+    if not enabled:
+        return _NULL_TIMER
+    return _Timer(name, labels)
+
+
+def value(name, **labels):
+    return _counters.get((name, tuple(sorted(labels.items()))), 0)
+
+
+def samples(name, **labels):
+    return list(_samples.get((name, tuple(sorted(labels.items()))), ()))
+
+
+def cache(name, hits=0, misses=0):
+    if not enabled:
+        return
+    count(name + "_hits", hits)
+    count(name + "_misses", misses)
+
+
+def hit_rate(name):
+    hits = _counters.get((name + "_hits", ()), 0)
+    misses = _counters.get((name + "_misses", ()), 0)
+    return hits / (hits + misses) if hits + misses else None
+
+
+def snapshot():
+    counters = {}
+    for (name, labels), value in sorted(_counters.items()):
+        counters.setdefault(name, []).append({"labels": dict(labels), "value": value})
+
+    histograms = {}
+    for (name, labels), (total, value_sum, buckets) in sorted(_histograms.items()):
+        cumulative, running = [], 0
+        for bucket in buckets:
+            running += bucket
+            cumulative.append(running)
+        histograms.setdefault(name, []).append({
+            "labels": dict(labels),
+            "count": total,
+            "sum": value_sum,
+            "mean": value_sum / total if total else 0.0,
+            "buckets": {_format_bound(bound): n for bound, n in zip(BUCKETS, cumulative)},
+        })
+
+    hit_rates = {}
+    for name, labels in _counters:
+        if name.endswith("_hits") and not labels:
+            base = name[:-len("_hits")]
+            hit_rates[base] = hit_rate(base)
+    return {"counters": counters, "histograms": histograms, "hit_rates": hit_rates}
+
+
+def to_prometheus():
+    lines = []
+    typed = set()
+    for (name, labels), value in sorted(_counters.items()):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {PREFIX}{name}_total counter")
+        lines.append(f"{PREFIX}{name}_total{_format_labels(labels)} {value}")
+    for (name, labels), (total, value_sum, buckets) in sorted(_histograms.items()):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+        running = 0
+        for bound, bucket in zip(BUCKETS, buckets):
+            running += bucket
+            bucket_labels = labels + (("le", _format_bound(bound)),)
+            lines.append(f"{PREFIX}{name}_bucket{_format_labels(bucket_labels)} {running}")
+        lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {value_sum}")
+        lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {total}")
+    return "\n".join(lines) + "\n"
+
+
+def dump_json(path):
+    try:
+        with open(path, "w") as file:
+            json.dump(snapshot(), file, indent=2)
+    except Exception as e:
+        print(f"Błąd podczas zapisywania metryk: {e}")
+
+
+def dump_prometheus(path):
+    try:
+        with open(path, "w") as file:
+            file.write(to_prometheus())
+    except Exception as e:
+        print(f"Błąd podczas zapisywania metryk: {e}")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
@@ -146,7 +146,7 @@ class MinesweeperGUI(QMainWindow):
             elif result == "win":
                 self._show_win_message()
             else:
-                self._update_board()
+                self._update_cells(self.game.last_change.cells)
         except Exception as e:
             print(f"Error in on_click: {e}")
 
@@ -156,43 +156,44 @@ class MinesweeperGUI(QMainWindow):
             self.game.flag(row, col)
             self._logger.log_move("flag", row, col, "AI_flagged", self.game)
             self._history_browser.append(f"Flagged: ({row}, {col})")
-            self._update_board()
+            self._update_cells(self.game.last_change.cells)
         except Exception as e:
             print(f"Error in on_right_click: {e}")
 
     def _toggle_highlight(self, row, col):
+        previous = self._highlighted_cell
         if self._highlighted_cell == (row, col):
             self._highlighted_cell = None
         else:
             self._highlighted_cell = (row, col)
-        self._update_board()
+        self._update_cells([cell for cell in (previous, (row, col)) if cell])
 
     def _update_board(self):
-        try:
-            for row in range(self.game.rows):
-                for col in range(self.game.cols):
-                    button = self._buttons[(row, col)]
-                    if self.game.flags[row][col]:
-                        button.setText("F")
-                        button.setStyleSheet("color: red; background-color: gray; font-weight: bold;")
-                    elif self.game.revealed[row][col]:
-                        if self.game.board[row][col] == -1:
-                            button.setText("*")
-                            button.setStyleSheet("color: black; background-color: darkgray; font-weight: bold;")
-                        else:
-                            number = self.game.board[row][col]
-                            button.setText(str(number) if number > 0 else " ")
-                            color = self._get_number_color(number)
-                            button.setStyleSheet(f"color: {color}; background-color: darkgray; font-weight: bold;")
-                    else:
-                        button.setText(" ")
-                        button.setStyleSheet("background-color: gray; font-weight: bold;")
+        self._update_cells((row, col) for row in range(self.game.rows) for col in range(self.game.cols))
 
-            if self._highlighted_cell:
-                row, col = self._highlighted_cell
+    def _update_cells(self, cells):
+        try:
+            for row, col in cells:
                 button = self._buttons[(row, col)]
-                original_color = self._get_original_color(row, col)
-                button.setStyleSheet(f"color: {original_color}; background-color: lightblue; font-weight: bold;")
+                if self.game.flags[row][col]:
+                    button.setText("F")
+                    button.setStyleSheet("color: red; background-color: gray; font-weight: bold;")
+                elif self.game.revealed[row][col]:
+                    if self.game.board[row][col] == -1:
+                        button.setText("*")
+                        button.setStyleSheet("color: black; background-color: darkgray; font-weight: bold;")
+                    else:
+                        number = self.game.board[row][col]
+                        button.setText(str(number) if number > 0 else " ")
+                        color = self._get_number_color(number)
+                        button.setStyleSheet(f"color: {color}; background-color: darkgray; font-weight: bold;")
+                else:
+                    button.setText(" ")
+                    button.setStyleSheet("background-color: gray; font-weight: bold;")
+
+                if self._highlighted_cell == (row, col):
+                    original_color = self._get_original_color(row, col)
+                    button.setStyleSheet(f"color: {original_color}; background-color: lightblue; font-weight: bold;")
         except Exception as e:
             print(f"Error in update_board: {e}")
 
@@ -235,16 +236,21 @@ class MinesweeperGUI(QMainWindow):
 
     def _play_ai_move(self):
         try:
-            move = self._ai_player.make_move()
-            if move:
-                action, row, col = move
+            moves = self._ai_player.make_moves()
+            if moves:
                 algorithm = self._ai_player.get_current_algorithm()
                 self._update_algorithm_status(algorithm)
-                self._results_logger.log_move(algorithm)
-                if action == 'reveal':
-                    self._on_click(row, col)
-                elif action == 'flag':
-                    self._on_right_click(row, col)
+                for move in moves:
+                    if not self._timer.isActive():
+                        break
+                    if not self._ai_player.is_valid_move(move):
+                        continue
+                    action, row, col = move
+                    self._results_logger.log_move(algorithm)
+                    if action == 'reveal':
+                        self._on_click(row, col)
+                    elif action == 'flag':
+                        self._on_right_click(row, col)
             else:
                 print("AI nie ma dostępnych ruchów.")
                 self._timer.stop()
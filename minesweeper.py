@@ -1,62 +1,206 @@
-import random
+from collections import deque, namedtuple
+from contextlib import contextmanager
+import numpy as np
+
+GameChange = namedtuple("GameChange", ["action", "row", "col", "result", "cells"])
+
+
+def calculate_numbers(mines):
+    padded = np.pad(mines, [(0, 0)] * (mines.ndim - 2) + [(1, 1), (1, 1)]).astype(np.int8)
+    rows, cols = mines.shape[-2:]
+    counts = np.zeros(mines.shape, dtype=np.int8)
+    for dr in range(3):
+        for dc in range(3):
+            if dr == 1 and dc == 1:
+                continue
+            counts += padded[..., dr:dr + rows, dc:dc + cols]
+    return np.where(mines, np.int8(-1), counts)
+
+
+def sample_mine_layout(rows, cols, mines, rng=None, safe_cell=None):
+    rng = np.random.default_rng(rng)
+    excluded = np.zeros((rows, cols), dtype=bool)
+    if safe_cell is not None:
+        row, col = safe_cell
+        excluded[max(row - 1, 0):row + 2, max(col - 1, 0):col + 2] = True
+        if rows * cols - np.count_nonzero(excluded) < mines:
+            excluded[...] = False
+            excluded[row, col] = True
+    candidates = np.flatnonzero(~excluded)
+    if mines > candidates.size:
+        raise ValueError(f"Nie można rozmieścić {mines} min na {candidates.size} wolnych polach.")
+    layout = np.zeros(rows * cols, dtype=bool)
+    layout[rng.choice(candidates, size=mines, replace=False)] = True
+    return layout.reshape(rows, cols)
+
+
+class GridView:
+    __slots__ = ("_array",)
+
+    def __init__(self, array):
+        self._array = array
+
+    def __getitem__(self, row):
+        return _RowView(self._array, row)
+
+    def __len__(self):
+        return self._array.shape[0]
+
+    def __iter__(self):
+        for row in range(self._array.shape[0]):
+            yield _RowView(self._array, row)
+
+    def tolist(self):
+        return self._array.tolist()
+
+
+class _RowView:
+    __slots__ = ("_array", "_row")
+
+    def __init__(self, array, row):
+        self._array = array
+        self._row = row
+
+    def __getitem__(self, col):
+        return self._array.item(self._row, col)
+
+    def __len__(self):
+        return self._array.shape[1]
+
+    def __iter__(self):
+        return iter(self._array[self._row].tolist())
+
+    def count(self, value):
+        return self._array[self._row].tolist().count(value)
+
 
 class Minesweeper:
-    def __init__(self, rows, cols, mines):
+    def __init__(self, rows, cols, mines, seed=None, first_click_safe=False, layout=None):
         self.rows = rows
         self.cols = cols
         self.mines = mines
-        self.board = [[0 for _ in range(cols)] for _ in range(rows)]
-        self.revealed = [[False for _ in range(cols)] for _ in range(rows)]
-        self.flags = [[False for _ in range(cols)] for _ in range(rows)]
-        self._place_mines()
-        self._calculate_numbers()
-
-    def _place_mines(self):
-        placed_mines = 0
-        while placed_mines < self.mines:
-            row = random.randint(0, self.rows - 1)
-            col = random.randint(0, self.cols - 1)
-            if self.board[row][col] == 0:
-                self.board[row][col] = -1
-                placed_mines += 1
+        self.board_array = np.zeros((rows, cols), dtype=np.int8)
+        self.revealed_array = np.zeros((rows, cols), dtype=bool)
+        self.flags_array = np.zeros((rows, cols), dtype=bool)
+        self.board = GridView(self.board_array)
+        self.revealed = GridView(self.revealed_array)
+        self.flags = GridView(self.flags_array)
+        self._rng = np.random.default_rng(seed)
+        self._hidden_safe = rows * cols - mines
+        self.last_change = None
+        self._subscribers = []
+        self._undo_log = []
+        self._open_snapshots = 0
+        self._mines_placed = False
+        if layout is not None:
+            self._place_mines(np.asarray(layout, dtype=bool))
+        elif not first_click_safe:
+            self._place_mines()
+
+    @classmethod
+    def from_layout(cls, layout):
+        layout = np.asarray(layout, dtype=bool)
+        rows, cols = layout.shape
+        return cls(rows, cols, int(np.count_nonzero(layout)), layout=layout)
+
+    def _place_mines(self, layout=None, safe_cell=None):
+        if layout is None:
+            layout = sample_mine_layout(self.rows, self.cols, self.mines, self._rng, safe_cell)
+        self.board_array[...] = calculate_numbers(layout)
+        self._mines_placed = True
+        if self._open_snapshots:
+            self._undo_log.append(("place", ()))
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def _publish(self, action, row, col, result, cells):
+        self.last_change = GameChange(action, row, col, result, tuple(cells))
+        if cells and self._open_snapshots and action != "restore":
+            self._undo_log.append((action, self.last_change.cells))
+        if cells:
+            for callback in list(self._subscribers):
+                callback(self.last_change)
+
+    def snapshot(self):
+        self._open_snapshots += 1
+        return len(self._undo_log)
+
+    def restore(self, token):
+        cells = []
+        while len(self._undo_log) > token:
+            action, changed = self._undo_log.pop()
+            if action == "place":
+                self.board_array[...] = 0
+                self._mines_placed = False
+            elif action == "flag":
+                for row, col in changed:
+                    self.flags_array[row, col] = not self.flags_array[row, col]
+            else:
+                for row, col in changed:
+                    self.revealed_array[row, col] = False
+                    if self.board_array[row, col] != -1:
+                        self._hidden_safe += 1
+            cells.extend(changed)
+        self._publish("restore", None, None, None, cells)
+
+    def release(self, token):
+        self._open_snapshots -= 1
+        if not self._open_snapshots:
+            self._undo_log.clear()
+
+    @contextmanager
+    def trial(self):
+        token = self.snapshot()
+        try:
+            yield self
+        finally:
+            self.restore(token)
+            self.release(token)
 
     def reveal(self, row, col):
-        if self.revealed[row][col] or self.flags[row][col]:
+        row, col = int(row), int(col)
+        if self.revealed_array[row, col] or self.flags_array[row, col]:
+            self._publish("reveal", row, col, None, ())
             return
-        self.revealed[row][col] = True
-        if self.board[row][col] == -1:
-            return "game_over"
-        elif self.board[row][col] == 0:
-            self._reveal_neighbors(row, col)
-        if self._check_win():
-            return "win"
-        return "safe"
+        if not self._mines_placed:
+            self._place_mines(safe_cell=(row, col))
+        self.revealed_array[row, col] = True
+        cells = [(row, col)]
+        if self.board_array[row, col] == -1:
+            result = "game_over"
+        else:
+            self._hidden_safe -= 1
+            if self.board_array[row, col] == 0:
+                self._reveal_neighbors(row, col, cells)
+            result = "win" if self._check_win() else "safe"
+        self._publish("reveal", row, col, result, cells)
+        return result
 
     def flag(self, row, col):
-        if not self.revealed[row][col]:
-            self.flags[row][col] = not self.flags[row][col]
+        row, col = int(row), int(col)
+        if self.revealed_array[row, col]:
+            self._publish("flag", row, col, None, ())
+            return
+        self.flags_array[row, col] = not self.flags_array[row, col]
+        self._publish("flag", row, col, None, [(row, col)])
 
-    def _reveal_neighbors(self, row, col):
-        for r in range(row - 1, row + 2):
-            for c in range(col - 1, col + 2):
-                if 0 <= r < self.rows and 0 <= c < self.cols and not self.revealed[r][c]:
-                    self.reveal(r, c)
+    def _reveal_neighbors(self, row, col, cells):
+        queue = deque([(row, col)])
+        while queue:
+            row, col = queue.popleft()
+            for r in range(max(row - 1, 0), min(row + 2, self.rows)):
+                for c in range(max(col - 1, 0), min(col + 2, self.cols)):
+                    if self.revealed_array[r, c] or self.flags_array[r, c]:
+                        continue
+                    self.revealed_array[r, c] = True
+                    self._hidden_safe -= 1
+                    cells.append((r, c))
+                    if self.board_array[r, c] == 0:
+                        queue.append((r, c))
 
     def _check_win(self):
-        for row in range(self.rows):
-            for col in range(self.cols):
-                if self.board[row][col] != -1 and not self.revealed[row][col]:
-                    return False
-        return True
-
-    def _calculate_numbers(self):
-        for row in range(self.rows):
-            for col in range(self.cols):
-                if self.board[row][col] == -1:
-                    continue
-                mine_count = 0
-                for r in range(row - 1, row + 2):
-                    for c in range(col - 1, col + 2):
-                        if 0 <= r < self.rows and 0 <= c < self.cols and self.board[r][c] == -1:
-                            mine_count += 1
-                self.board[row][col] = mine_count
+        return self._hidden_safe == 0
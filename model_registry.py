@@ -0,0 +1,80 @@
+import os
+import pickle
+from forest_compiler import compile_forest, load_compiled, save_compiled, verify_equivalence
+
+_models = {}
+_forests = {}
+
+
+def get_model(model_path="model.pkl", trainer=None):
+    if model_path not in _models:
+        model = _load(model_path)
+        if model is None and trainer is not None:
+            model = trainer()
+        _models[model_path] = model
+    return _models[model_path]
+
+
+def get_forest(model_path="model.pkl", trainer=None):
+    if model_path not in _forests:
+        forest = load_compiled(model_path)
+        if forest is None:
+            forest = get_model(model_path, trainer)
+            if forest is not None:
+                compiled = compile_forest(forest)
+                if verify_equivalence(forest, compiled):
+                    save_compiled(compiled, model_path)
+                    forest = compiled
+        _forests[model_path] = forest
+    return _forests[model_path]
+
+
+def is_loaded(model_path="model.pkl"):
+    return _models.get(model_path) is not None or _forests.get(model_path) is not None
+
+
+def forget(model_path=None):
+    if model_path is None:
+        _models.clear()
+        _forests.clear()
+    else:
+        _models.pop(model_path, None)
+        _forests.pop(model_path, None)
+
+
+def write_atomic(path, write):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(temporary)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def _write_pickle(model, path):
+    with open(path, "wb") as file:
+        pickle.dump(model, file)
+
+
+def save_model(model, model_path="model.pkl"):
+    try:
+        write_atomic(model_path, lambda path: _write_pickle(model, path))
+        print(f"Model zapisany do pliku: {model_path}")
+    except Exception as e:
+        print(f"Błąd podczas zapisywania modelu: {e}")
+    return model
+
+
+def _load(model_path):
+    try:
+        with open(model_path, "rb") as file:
+            model = pickle.load(file)
+            print("Model wczytany.")
+    except FileNotFoundError:
+        print(f"Plik {model_path} nie istnieje. Trzeba wytrenować model.")
+        return None
+    except Exception as e:
+        print(f"Błąd podczas wczytywania modelu: {e}")
+        return None
+    return model
@@ -1,52 +1,359 @@
-import random
-from collections import defaultdict
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+import atexit
+import multiprocessing
+from itertools import repeat
+import time
+import numpy as np
+from constraint_solver import build_constraints, cells_in, constraint_order, propagate, split_components
+from probability_engine import ExactProbabilityEngine, combine_parts, component_weights, mine_tilt, scaled
+from board_analysis import BoardAnalysis
+import instrumentation
+import tracing
+
+SamplingProblem = namedtuple("SamplingProblem", ["cells", "exact", "sampled", "mines", "log_tilt"])
+ExactPart = namedtuple("ExactPart", ["cells", "log_counts", "rates"])
+SampledPart = namedtuple("SampledPart", ["cells", "cell_constraints", "targets", "sizes"])
+PartTotals = namedtuple("PartTotals", ["log_scale", "weights", "hits", "samples"])
+AnalysisResult = namedtuple("AnalysisResult", ["move", "risk", "samples", "half_width", "exact"])
+
+_pools = {}
+
+
+def _get_pool(workers):
+    if workers not in _pools:
+        _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _pools[workers]
+
+
+def shutdown_pools():
+    while _pools:
+        _, pool = _pools.popitem()
+        pool.shutdown(cancel_futures=True)
+
+
+atexit.register(shutdown_pools)
+
+
+def build_sampling_problem(game, analysis=None, exact=None, deadline=None):
+    if analysis is None:
+        frontier_cells, constraints = build_constraints(game)
+        components = split_components(constraints)
+        hidden = ~game.revealed_array & ~game.flags_array
+        cells = [(int(r), int(c)) for r, c in zip(*np.nonzero(hidden))]
+    else:
+        frontier_cells, _ = analysis.constraints()
+        components = analysis.components()
+        cells = analysis.hidden_cells()
+    index = {cell: i for i, cell in enumerate(cells)}
+    mines = game.mines - int(np.count_nonzero(game.flags_array))
+    log_tilt = mine_tilt(mines, len(cells))
+
+    exact_parts = []
+    sampled_parts = []
+    pending = list(components)
+    while pending:
+        component = pending.pop()
+        solved = exact.solve_component(component, frontier_cells, deadline) if exact is not None else None
+        if solved is not None:
+            component_cells, counts, cell_counts = solved
+            exact_parts.append(ExactPart(
+                np.array([index[cell] for cell in component_cells], dtype=np.int64),
+                *component_weights(counts, cell_counts, log_tilt),
+            ))
+            continue
+        reduced = propagate(component, deadline)
+        if reduced is None or not (reduced[0] or reduced[1]):
+            sampled_parts.append(_sampled_part(component, frontier_cells, index))
+            continue
+        safe, known_mines, rest = reduced
+        for mask, mine in ((safe, False), (known_mines, True)):
+            if mask:
+                exact_parts.append(_known_part([index[cell] for cell in cells_in(mask, frontier_cells)], mine, log_tilt))
+        pending.extend(split_components(list(rest)))
+
+    return SamplingProblem(
+        cells=cells,
+        exact=exact_parts,
+        sampled=sampled_parts,
+        mines=mines,
+        log_tilt=log_tilt,
+    )
+
+
+def _known_part(cells, mine, log_tilt):
+    size = len(cells)
+    log_counts = np.full(size + 1, -np.inf)
+    rates = np.zeros((size + 1, size))
+    if mine:
+        log_counts[size] = size * log_tilt
+        rates[size] = 1.0
+    else:
+        log_counts[0] = 0.0
+    return ExactPart(np.array(cells, dtype=np.int64), log_counts, rates)
+
+
+def _sampled_part(component, frontier_cells, index):
+    mask = 0
+    for constraint_mask, _ in component:
+        mask |= constraint_mask
+    component_cells = cells_in(mask, frontier_cells)
+    local = {cell: i for i, cell in enumerate(component_cells)}
+    members = [
+        (tuple(sorted(local[cell] for cell in cells_in(constraint_mask, frontier_cells))), count)
+        for constraint_mask, count in component
+    ]
+    cell_constraints = [[] for _ in component_cells]
+    for position, (cells_of_constraint, _) in enumerate(members):
+        for cell in cells_of_constraint:
+            cell_constraints[cell].append(position)
+    order = constraint_order(len(component_cells), members, cell_constraints)
+    return SampledPart(
+        cells=np.array([index[component_cells[cell]] for cell in order], dtype=np.int64),
+        cell_constraints=[np.array(cell_constraints[cell], dtype=np.int64) for cell in order],
+        targets=np.array([count for _, count in members], dtype=np.int32),
+        sizes=np.array([len(cells_of_constraint) for cells_of_constraint, _ in members], dtype=np.int32),
+    )
+
+
+def sample_chunk(problem, seed, samples):
+    rng = np.random.default_rng(seed)
+    return tuple(_sample_part(part, rng, samples, problem.mines, problem.log_tilt) for part in problem.sampled)
+
+
+def _sample_part(part, rng, samples, mines, log_tilt):
+    size = len(part.cells)
+    need = np.tile(part.targets, (samples, 1))
+    left = part.sizes.copy()
+    layout = np.zeros((samples, size), dtype=bool)
+    placed = np.zeros(samples, dtype=np.int64)
+    log_weight = np.zeros(samples)
+    log_base = 0.0
+
+    for position, touched in enumerate(part.cell_constraints):
+        remaining = need[:, touched]
+        can_be_safe = (remaining <= left[touched] - 1).all(axis=1)
+        can_be_mine = (remaining >= 1).all(axis=1) & (placed < mines)
+        both = can_be_safe & can_be_mine
+        proposal = np.clip((remaining / left[touched]).mean(axis=1), 0.05, 0.95)
+        mine = np.where(both, rng.random(samples) < proposal, can_be_mine)
+        log_weight[both] -= np.log(np.where(mine, proposal, 1 - proposal)[both])
+        log_weight[mine] += log_tilt
+        log_weight[~(can_be_safe | can_be_mine)] = -np.inf
+        layout[:, position] = mine
+        placed += mine
+        need[:, touched] -= mine[:, None]
+        left[touched] -= 1
+
+        if not np.isfinite(log_weight).any():
+            return _empty_totals(size, samples)
+        weight = np.exp(log_weight - log_weight.max())
+        if weight.sum() ** 2 < samples / 2 * (weight @ weight):
+            chosen = rng.choice(samples, samples, p=weight / weight.sum())
+            log_base += log_weight.max() + np.log(weight.mean())
+            need, layout, placed = need[chosen], layout[chosen], placed[chosen]
+            log_weight = np.zeros(samples)
+
+    log_scale = float(log_weight.max())
+    weight = np.exp(log_weight - log_scale)
+    hits = np.zeros((size + 1, size))
+    np.add.at(hits, placed, weight[:, None] * layout)
+    return PartTotals(log_base + log_scale, np.bincount(placed, weight, size + 1), hits, samples)
+
+
+def _empty_totals(size, samples=0):
+    return PartTotals(-np.inf, np.zeros(size + 1), np.zeros((size + 1, size)), samples)
+
+
+def empty_totals(problem):
+    return tuple(_empty_totals(len(part.cells)) for part in problem.sampled)
+
+
+def merge_totals(a, b):
+    return tuple(_merge_part(x, y) for x, y in zip(a, b))
+
+
+def _merge_part(a, b):
+    log_scale = max(a.log_scale, b.log_scale)
+    if log_scale == -np.inf:
+        return PartTotals(log_scale, a.weights, a.hits, a.samples + b.samples)
+    scale_a = np.exp(a.log_scale - log_scale)
+    scale_b = np.exp(b.log_scale - log_scale)
+    return PartTotals(
+        log_scale,
+        a.weights * scale_a + b.weights * scale_b,
+        a.hits * scale_a + b.hits * scale_b,
+        a.samples + b.samples,
+    )
+
+
+def has_samples(totals):
+    return all(part.weights.any() for part in totals)
+
+
+def risks_from_totals(problem, totals):
+    parts = [(part.cells, part.log_counts, part.rates) for part in problem.exact]
+    for part, sampled in zip(problem.sampled, totals):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_counts = np.log(sampled.weights) + sampled.log_scale - np.log(sampled.samples)
+            rates = np.nan_to_num(sampled.hits / sampled.weights[:, None])
+        parts.append((part.cells, log_counts, rates))
+
+    return combine_parts(parts, len(problem.cells), problem.mines, problem.log_tilt)
+
+
+def fallback_risks(problem):
+    risks = np.full(len(problem.cells), problem.mines / len(problem.cells))
+    for part in problem.exact:
+        posterior = scaled(part.log_counts)
+        risks[part.cells] = posterior @ part.rates / posterior.sum()
+    for part in problem.sampled:
+        for cell, touched in zip(part.cells, part.cell_constraints):
+            risks[cell] = float((part.targets[touched] / part.sizes[touched]).max())
+    return risks
+
+
+def chunk_half_width(estimates, cell, z=1.96):
+    estimates = [risks[cell] for risks in estimates if risks is not None]
+    if len(estimates) < 2:
+        return 1.0
+    return z * float(np.std(estimates, ddof=1)) / len(estimates) ** 0.5
+
+
+def sampling_error(game, chunks=20, chunk_size=1024, seed=0):
+    exact = ExactProbabilityEngine(game).probabilities()
+    if exact is None:
+        return None
+    problem = build_sampling_problem(game)
+    totals = empty_totals(problem)
+    for chunk_seed in np.random.SeedSequence(seed).spawn(chunks):
+        totals = merge_totals(totals, sample_chunk(problem, chunk_seed, chunk_size))
+    risks = risks_from_totals(problem, totals) if has_samples(totals) else None
+    if risks is None:
+        return 1.0
+    return max(abs(float(risks[i]) - exact[cell]) for i, cell in enumerate(problem.cells))
+
 
 class MonteCarloAnalyzer:
-    def __init__(self, game):
+    def __init__(self, game, seed=None, chunk_size=1024, round_chunks=4, workers=1, analysis=None, min_chunk_size=32,
+                 exact_share=0.5):
         self.game = game
+        self._analysis = analysis or BoardAnalysis(game)
+        self._exact = ExactProbabilityEngine(game, analysis=self._analysis)
+        self._seed = np.random.SeedSequence(seed)
+        self._chunk_size = chunk_size
+        self._round_chunks = round_chunks
+        self._min_chunk_size = min_chunk_size
+        self._exact_share = exact_share
+        self._workers = workers
 
-    def analyze(self, iterations=1000):
-        scores = defaultdict(int)
+    def analyze(self, iterations=1000, tolerance=0.02, max_samples=50000):
+        exact = self._exact.best_move()
+        if exact:
+            best_move, risk = exact
+            tracing.info("Wybrane pole (rachunek dokładny): {} z ryzykiem {:.2%}", best_move, risk)
+            return best_move
 
-        for _ in range(iterations):
-            simulated_board = self._simulate_board()
+        return self._analyze_sampled(iterations, tolerance, max_samples)
 
-            for row in range(self.game.rows):
-                for col in range(self.game.cols):
-                    if not self.game.revealed[row][col] and not self.game.flags[row][col]:
-                        if simulated_board[row][col] == -1:
-                            scores[(row, col)] += 1
+    def _sample_round(self, problem, seeds, sizes, deadline=None):
+        if self._workers > 1 and multiprocessing.parent_process() is None:
+            timeout = None if deadline is None else max(deadline - time.perf_counter(), 0.0)
+            chunks = _get_pool(self._workers).map(sample_chunk, repeat(problem), seeds, sizes, timeout=timeout)
+        else:
+            chunks = map(sample_chunk, repeat(problem), seeds, sizes)
+        try:
+            yield from zip(sizes, chunks)
+        except TimeoutError:
+            return
 
-        min_risk = float('inf')
-        best_move = None
-        for (row, col), risk in scores.items():
-            if risk < min_risk:
-                min_risk = risk
-                best_move = (row, col)
+    def analyze_within(self, budget, tolerance=None, max_samples=None):
+        started = time.perf_counter()
+        deadline = started + budget
+        exact = self._exact.best_move(started + budget * self._exact_share)
+        if exact:
+            best_move, risk = exact
+            return AnalysisResult(best_move, risk, 0, 0.0, True)
 
-        print("=== Wyniki Monte Carlo ===")
-        for (row, col), risk in scores.items():
-            print(f"Pole ({row}, {col}): Ryzyko = {risk / iterations:.2%}")
-        print(f"Wybrane pole: {best_move} z ryzykiem {min_risk / iterations:.2%}")
+        problem = build_sampling_problem(self.game, self._analysis, self._exact, started + budget * self._exact_share)
+        if not problem.cells:
+            return None
+        result = None
+        drawn = 0
+        for totals, estimates, drawn in self._refine(problem, deadline):
+            risks = risks_from_totals(problem, totals) if has_samples(totals) else None
+            if risks is not None:
+                best = int(np.argmin(risks))
+                half_width = chunk_half_width(estimates, best) if problem.sampled else 0.0
+                result = AnalysisResult(problem.cells[best], float(risks[best]), drawn, half_width, False)
+                if tolerance is not None and half_width < tolerance:
+                    break
+            if time.perf_counter() >= deadline or (max_samples and drawn >= max_samples):
+                break
+        if result is None:
+            risks = self._fallback_risks(problem)
+            best = int(np.argmin(risks))
+            result = AnalysisResult(problem.cells[best], float(risks[best]), drawn, 1.0, False)
+        return result
 
-        return best_move
+    def _chunk_sizes(self, deadline, started, drawn):
+        if deadline is None:
+            return [self._chunk_size] * self._round_chunks
+        now = time.perf_counter()
+        if not drawn:
+            return [min(self._chunk_size, self._min_chunk_size)] if now < deadline else []
+        per_sample = (now - started) / drawn
+        size = min(self._chunk_size, int((deadline - now) / per_sample / self._round_chunks))
+        return [size] * self._round_chunks if size >= self._min_chunk_size else []
+
+    def _refine(self, problem, deadline=None):
+        instrumentation.count("cells_scanned", len(problem.cells), strategy="Monte Carlo")
+        totals = empty_totals(problem)
+        if not problem.sampled:
+            yield totals, [], 0
+            return
+        seeds = self._seed.spawn(1)[0]
+        estimates = []
+        drawn = 0
+        started = time.perf_counter()
+        while True:
+            sizes = self._chunk_sizes(deadline, started, drawn)
+            if not sizes:
+                return
+            for size, chunk in self._sample_round(problem, seeds.spawn(len(sizes)), sizes, deadline):
+                estimates.append(risks_from_totals(problem, chunk) if has_samples(chunk) else None)
+                totals = merge_totals(totals, chunk)
+                drawn += size
+                instrumentation.count("samples", size)
+                yield totals, estimates, drawn
 
-    def _simulate_board(self):
-        simulated_board = [[0 for _ in range(self.game.cols)] for _ in range(self.game.rows)]
-
-        for row in range(self.game.rows):
-            for col in range(self.game.cols):
-                if self.game.revealed[row][col]:
-                    simulated_board[row][col] = self.game.board[row][col]
-
-        remaining_mines = self.game.mines - sum(
-            row.count(-1) for row in simulated_board
-        )
-        while remaining_mines > 0:
-            row = random.randint(0, self.game.rows - 1)
-            col = random.randint(0, self.game.cols - 1)
-            if not self.game.revealed[row][col] and simulated_board[row][col] != -1:
-                simulated_board[row][col] = -1
-                remaining_mines -= 1
-
-        return simulated_board
+    def _fallback_risks(self, problem):
+        tracing.warning("Próbkowanie Monte Carlo nie dało wyniku, wybieram pole według lokalnego ryzyka.")
+        return fallback_risks(problem)
+
+    def _analyze_sampled(self, iterations, tolerance, max_samples):
+        problem = build_sampling_problem(self.game, self._analysis, self._exact)
+        if not problem.cells:
+            return None
+
+        for totals, estimates, drawn in self._refine(problem):
+            risks = risks_from_totals(problem, totals) if has_samples(totals) else None
+            if drawn >= max_samples:
+                break
+            if drawn < iterations or risks is None:
+                continue
+            if chunk_half_width(estimates, int(np.argmin(risks))) < tolerance:
+                break
+
+        if risks is None:
+            risks = self._fallback_risks(problem)
+        best = int(np.argmin(risks))
+        best_move = problem.cells[best]
+
+        if tracing.enabled_for(tracing.DEBUG):
+            tracing.debug("=== Wyniki Monte Carlo ===")
+            for (row, col), risk in zip(problem.cells, risks.tolist()):
+                tracing.debug("Pole ({}, {}): Ryzyko = {:.2%}", row, col, risk)
+        tracing.info("Wybrane pole: {} z ryzykiem {:.2%} ({} próbek)", best_move, float(risks[best]), drawn)
+
+        return best_move
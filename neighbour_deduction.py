@@ -1,38 +1,69 @@
+from board_analysis import BoardAnalysis
+import instrumentation
+import tracing
+
+
 class NeighbourDeduction:
-    def __init__(self, game):
+    def __init__(self, game, analysis=None):
         self.game = game
+        self._analysis = analysis or BoardAnalysis(game)
+        self._dirty = set(self._analysis.frontier)
+        game.subscribe(self._on_change)
 
     def find_move(self):
-        for row in range(self.game.rows):
-            for col in range(self.game.cols):
-                if not self.game.revealed[row][col]:
-                    continue
-
-                mine_count = self.game.board[row][col]
-                neighbours = self._get_neighbours(row, col)
-
-                hidden_neighbours = [n for n in neighbours if not self.game.revealed[n[0]][n[1]]]
-                flagged_neighbours = [n for n in neighbours if self.game.flags[n[0]][n[1]]]
-                if len(flagged_neighbours) < mine_count:
-                    continue
-                if len(flagged_neighbours) == mine_count and len(hidden_neighbours) > 0:
-                    print(
-                        f"Pole ({row}, {col}) -> miny: {mine_count}, ukryte: {len(hidden_neighbours)}, flagi: {len(flagged_neighbours)}"
-                    )
-                    for n in hidden_neighbours:
-                        if not self.game.flags[n[0]][n[1]]:
-                            return ('reveal', n[0], n[1])
+        for row, col in sorted(self._dirty):
+            safe, mines = self._classify(row, col)
+            if safe:
+                tracing.debug("Pole ({}, {}) -> bezpieczne sąsiednie pola: {}", row, col, len(safe))
+                return ('reveal', safe[0][0], safe[0][1])
+            if not mines:
+                self._dirty.discard((row, col))
 
         return None
 
+    def find_moves(self):
+        instrumentation.count("cells_scanned", len(self._dirty), strategy="Neighbour Deduction")
+        reveals, flags = set(), set()
+        for row, col in sorted(self._dirty):
+            safe, mines = self._classify(row, col)
+            if not safe and not mines:
+                self._dirty.discard((row, col))
+            reveals.update(safe)
+            flags.update(mines)
+
+        conflicts = reveals & flags
+        reveals -= conflicts
+        flags -= conflicts
+        return [('reveal', r, c) for r, c in sorted(reveals)] + [('flag', r, c) for r, c in sorted(flags)]
+
+    def _classify(self, row, col):
+        revealed = self.game.revealed_array
+        flags = self.game.flags_array
+        mine_count = self.game.board_array[row, col]
+        hidden_neighbours = [n for n in self._get_neighbours(row, col) if not revealed[n]]
+        unflagged_neighbours = [n for n in hidden_neighbours if not flags[n]]
+        remaining_mines = mine_count - (len(hidden_neighbours) - len(unflagged_neighbours))
+        if not unflagged_neighbours:
+            return [], []
+        if remaining_mines == 0:
+            return unflagged_neighbours, []
+        if remaining_mines == len(unflagged_neighbours):
+            return [], unflagged_neighbours
+        return [], []
+
+    def _on_change(self, change):
+        touched = set()
+        for row, col in change.cells:
+            touched.add((row, col))
+            touched.update(self._get_neighbours(row, col))
+        for cell in touched:
+            self._refresh(cell)
+
+    def _refresh(self, cell):
+        if cell in self._analysis.frontier:
+            self._dirty.add(cell)
+        else:
+            self._dirty.discard(cell)
+
     def _get_neighbours(self, row, col):
-        neighbours = []
-        for r in range(row - 1, row + 2):
-            for c in range(col - 1, col + 2):
-                if (r == row and c == col) or not self._is_valid(r, c):
-                    continue
-                neighbours.append((r, c))
-        return neighbours
-
-    def _is_valid(self, row, col):
-        return 0 <= row < self.game.rows and 0 <= col < self.game.cols
+        return self._analysis.neighbours(row, col)
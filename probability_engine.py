@@ -0,0 +1,204 @@
+from collections import OrderedDict
+from math import lgamma, log
+import time
+import numpy as np
+from constraint_solver import cells_in, constraint_order
+from board_analysis import BoardAnalysis
+import instrumentation
+
+
+class ExactProbabilityEngine:
+    def __init__(self, game, max_component_cells=60, max_nodes=20000, cache_size=512, analysis=None):
+        self.game = game
+        self._analysis = analysis or BoardAnalysis(game)
+        self._max_component_cells = max_component_cells
+        self._max_nodes = max_nodes
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def best_move(self, deadline=None):
+        probabilities = self.probabilities(deadline)
+        if not probabilities:
+            return None
+        cell = min(probabilities, key=lambda cell: (probabilities[cell], cell))
+        return cell, probabilities[cell]
+
+    def probabilities(self, deadline=None):
+        cells, _ = self._analysis.constraints()
+        instrumentation.count("cells_scanned", len(cells), strategy="Exact")
+        components = []
+        for component in self._analysis.components():
+            solved = self.solve_component(component, cells, deadline)
+            if solved is None:
+                return None
+            components.append(solved)
+
+        hidden = self._analysis.hidden_cells()
+        index = {cell: i for i, cell in enumerate(hidden)}
+        mines = self.game.mines - int(np.count_nonzero(self.game.flags_array))
+        log_tilt = mine_tilt(mines, len(hidden))
+        parts = [
+            (np.array([index[cell] for cell in component_cells], dtype=np.int64),)
+            + component_weights(counts, cell_counts, log_tilt)
+            for component_cells, counts, cell_counts in components
+        ]
+        risks = combine_parts(parts, len(hidden), mines, log_tilt, deadline)
+        if risks is None:
+            return None
+        return dict(zip(hidden, risks.tolist()))
+
+    def solve_component(self, constraints, cells, deadline=None):
+        mask = 0
+        for constraint_mask, _ in constraints:
+            mask |= constraint_mask
+        component_cells = sorted(cells_in(mask, cells))
+        if len(component_cells) > self._max_component_cells:
+            return None
+
+        local = {cell: i for i, cell in enumerate(component_cells)}
+        local_constraints = tuple(sorted(
+            (tuple(sorted(local[cell] for cell in cells_in(constraint_mask, cells))), count)
+            for constraint_mask, count in constraints
+        ))
+        signature = (tuple(component_cells), local_constraints)
+        if signature in self._cache:
+            instrumentation.cache("component_cache", hits=1)
+            self._cache.move_to_end(signature)
+            return self._cache[signature]
+        instrumentation.cache("component_cache", misses=1)
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+
+        enumerated = _enumerate(len(component_cells), local_constraints, self._max_nodes, deadline)
+        if enumerated is None and deadline is not None and time.perf_counter() >= deadline:
+            return None
+        solved = None if enumerated is None else (component_cells,) + enumerated
+        self._cache[signature] = solved
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return solved
+
+
+def _enumerate(size, constraints, max_nodes, deadline=None):
+    cell_constraints = [[] for _ in range(size)]
+    need = []
+    left = []
+    for index, (members, count) in enumerate(constraints):
+        need.append(count)
+        left.append(len(members))
+        for cell in members:
+            cell_constraints[cell].append(index)
+
+    order = constraint_order(size, constraints, cell_constraints)
+    counts = [0] * (size + 1)
+    cell_counts = [[0] * size for _ in range(size + 1)]
+    assignment = [0] * size
+    nodes = 0
+
+    def search(position, mines):
+        nonlocal nodes
+        nodes += 1
+        if nodes > max_nodes:
+            raise _BudgetExceeded()
+        if deadline is not None and not nodes % 4096 and time.perf_counter() >= deadline:
+            raise _BudgetExceeded()
+        if position == size:
+            counts[mines] += 1
+            row = cell_counts[mines]
+            for cell in range(size):
+                if assignment[cell]:
+                    row[cell] += 1
+            return
+        cell = order[position]
+        for value in (0, 1):
+            feasible = True
+            for index in cell_constraints[cell]:
+                need[index] -= value
+                left[index] -= 1
+                if need[index] < 0 or need[index] > left[index]:
+                    feasible = False
+            if feasible:
+                assignment[cell] = value
+                search(position + 1, mines + value)
+            for index in cell_constraints[cell]:
+                need[index] += value
+                left[index] += 1
+        assignment[cell] = 0
+
+    try:
+        search(0, 0)
+    except _BudgetExceeded:
+        return None
+    if not any(counts):
+        return None
+    return counts, cell_counts
+
+
+def mine_tilt(mines, cells):
+    return log(mines / (cells - mines)) if 0 < mines < cells else 0.0
+
+
+def component_weights(counts, cell_counts, log_tilt):
+    log_counts = np.array([log(ways) + k * log_tilt if ways else -np.inf for k, ways in enumerate(counts)])
+    rates = np.array([[hits / ways if ways else 0.0 for hits in row] for ways, row in zip(counts, cell_counts)])
+    return log_counts, rates
+
+
+def combine_parts(parts, cell_count, mines, log_tilt=0.0, deadline=None):
+    frontier = sum(len(cells) for cells, _, _ in parts)
+    unconstrained = cell_count - frontier
+    log_tail = np.array([
+        log_comb(unconstrained, mines - total) - total * log_tilt for total in range(frontier + 1)
+    ])
+    if not np.isfinite(log_tail).any():
+        return None
+    weights = [scaled(log_counts) for _, log_counts, _ in parts]
+
+    forward = [np.ones(1)]
+    for weight in weights:
+        forward.append(_normalised(np.convolve(forward[-1], weight)))
+    backward = [scaled(log_tail)]
+    for weight in reversed(weights):
+        padded = np.concatenate([backward[-1], np.zeros(len(weight) - 1)])
+        backward.append(_normalised(np.correlate(padded, weight, "valid")))
+    backward.reverse()
+
+    risks = np.zeros(cell_count)
+    expected = 0.0
+    for (cells, _, rates), weight, before, after in zip(parts, weights, forward, backward[1:]):
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        posterior = weight * np.correlate(after[:len(before) + len(weight) - 1], before, "valid")
+        if not posterior.sum():
+            return None
+        posterior /= posterior.sum()
+        risks[cells] = posterior @ rates
+        expected += posterior @ np.arange(len(posterior))
+    if unconstrained:
+        other = np.ones(cell_count, dtype=bool)
+        for cells, _, _ in parts:
+            other[cells] = False
+        risks[other] = (mines - expected) / unconstrained
+    return risks
+
+
+def log_comb(n, k):
+    if k < 0 or k > n:
+        return -np.inf
+    return lgamma(n + 1) - lgamma(k + 1) - lgamma(n - k + 1)
+
+
+def scaled(log_values):
+    top = log_values.max()
+    if not np.isfinite(top):
+        return np.zeros(len(log_values))
+    return np.exp(log_values - top)
+
+
+def _normalised(values):
+    top = values.max()
+    return values / top if top > 0 else values
+
+
+class _BudgetExceeded(Exception):
+    pass
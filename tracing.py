@@ -0,0 +1,84 @@
+import time
+from collections import deque
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+console_level = INFO
+buffer_level = INFO
+_threshold = INFO
+_buffer = deque(maxlen=5000)
+
+
+def configure(console=None, buffer=None, capacity=None):
+    global console_level, buffer_level, _threshold, _buffer
+    if console is not None:
+        console_level = console
+    if buffer is not None:
+        buffer_level = buffer
+    if capacity is not None:
+        _buffer = deque(_buffer, maxlen=capacity)
+    _threshold = min(console_level, buffer_level)
+
+
+def enabled_for(level):
+    return level >= _threshold
+
+
+def event(level, message, *args):
+    if level < _threshold:
+        return
+    if level >= buffer_level:
+        _buffer.append((time.time(), level, message, args))
+    if level >= console_level:
+        print(message.format(*args) if args else message)
+
+
+def debug(message, *args):
+    if DEBUG >= _threshold:
+        event(DEBUG, message, *args)
+
+
+def info(message, *args):
+    if INFO >= _threshold:
+        event(INFO, message, *args)
+
+
+def warning(message, *args):
+    if WARNING >= _threshold:
+        event(WARNING, message, *args)
+
+
+def error(message, *args):
+    if ERROR >= _threshold:
+        event(ERROR, message, *args)
+
+
+def clear():
+    _buffer.clear()
+
+
+def events():
+    return [
+        f"{time.strftime('%H:%M:%S', time.localtime(stamp))}.{int(stamp % 1 * 1000):03d} "
+        f"{LEVEL_NAMES.get(level, level)} {message.format(*args) if args else message}"
+        for stamp, level, message, args in _buffer
+    ]
+
+
+def dump(path=None):
+    lines = events()
+    if path is None:
+        for line in lines:
+            print(line)
+        return lines
+    try:
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+    except Exception as e:
+        print(f"Błąd podczas zapisywania śladu: {e}")
+    return lines
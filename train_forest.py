@@ -0,0 +1,150 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.utils import class_weight
+import model_registry
+
+
+def metadata_path(model_path):
+    return os.path.splitext(model_path)[0] + ".meta.json"
+
+
+def _write_metadata(metadata, path):
+    with open(path, "w") as file:
+        json.dump(metadata, file, indent=2)
+
+
+def dataset_fingerprint(data_path, rows):
+    digest = hashlib.sha256()
+    with open(data_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    digest.update(str(rows).encode())
+    return digest.hexdigest()
+
+
+def load_metadata(model_path):
+    try:
+        with open(metadata_path(model_path)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Błąd podczas wczytywania metadanych modelu: {e}")
+        return None
+
+
+def load_training_data(data_path):
+    try:
+        data = pd.read_csv(data_path)
+        print("Dane wczytane.")
+        data = validate_data(data)
+        features = data.drop(columns=["Label"]).values
+        target = data["Label"].values
+        print("Dane przetworzone.")
+        print(f"Unikalne klasy w danych: {np.unique(target)}")
+        return features, target
+    except Exception as e:
+        print(f"Błąd podczas przetwarzania danych: {e}")
+        return None, None
+
+
+def validate_data(data):
+    data = data.dropna()
+
+    for col in data.columns:
+        if not pd.to_numeric(data[col], errors='coerce').notnull().all():
+            print(f"Kolumna {col} zawiera niepoprawne dane. Usuwam te wiersze.")
+            data = data[pd.to_numeric(data[col], errors='coerce').notnull()]
+
+    return data
+
+
+def _class_weights(target):
+    classes = np.unique(target)
+    weights = class_weight.compute_class_weight(class_weight="balanced", classes=classes, y=target)
+    return {i: weight for i, weight in enumerate(weights)}
+
+
+def _load_previous(model_path):
+    try:
+        with open(model_path, "rb") as file:
+            return pickle.load(file)
+    except Exception:
+        return None
+
+
+def train_forest(data_path='game_log_processed_data.csv', model_path="model.pkl", n_estimators=100,
+                 add_estimators=25, force=False, n_jobs=-1):
+    features, target = load_training_data(data_path)
+    if features is None or target is None or not len(target):
+        print("Brak przetworzonych danych. Nie można wytrenować modelu.")
+        return None
+
+    fingerprint = dataset_fingerprint(data_path, len(target))
+    metadata = load_metadata(model_path)
+    previous = None if force else _load_previous(model_path)
+    if previous is not None and metadata and metadata.get("fingerprint") == fingerprint:
+        print("Dane treningowe bez zmian. Pomijam trenowanie.")
+        return previous
+
+    model = None
+    if previous is not None and metadata and len(target) > metadata.get("rows", 0):
+        try:
+            previous.set_params(
+                warm_start=True,
+                n_estimators=len(previous.estimators_) + add_estimators,
+                class_weight=_class_weights(target),
+                n_jobs=n_jobs,
+            )
+            previous.fit(features, target)
+            model = previous
+            print(f"Dodano {add_estimators} drzew dla nowych danych ({len(model.estimators_)} łącznie).")
+        except Exception as e:
+            print(f"Nie można douczyć modelu ({e}). Trenuję od nowa.")
+
+    if model is None:
+        try:
+            model = RandomForestClassifier(
+                n_estimators=n_estimators,
+                random_state=42,
+                class_weight=_class_weights(target),
+                n_jobs=n_jobs,
+            )
+            model.fit(features, target)
+            print("Model został wytrenowany z balansem klas.")
+        except Exception as e:
+            print(f"Błąd podczas trenowania modelu: {e}")
+            return None
+
+    model.set_params(warm_start=False)
+    model_registry.forget(model_path)
+    model = model_registry.save_model(model, model_path)
+    metadata = {
+        "fingerprint": fingerprint,
+        "rows": int(len(target)),
+        "data_path": data_path,
+        "n_estimators": len(model.estimators_),
+    }
+    try:
+        model_registry.write_atomic(metadata_path(model_path), lambda path: _write_metadata(metadata, path))
+    except Exception as e:
+        print(f"Błąd podczas zapisywania metadanych modelu: {e}")
+    return model
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Trenowanie lasu losowego do flagowania min.")
+    parser.add_argument("--data", default='game_log_processed_data.csv')
+    parser.add_argument("--model", default="model.pkl")
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--add-trees", type=int, default=25)
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--jobs", type=int, default=-1)
+    args = parser.parse_args()
+    train_forest(args.data, args.model, args.trees, args.add_trees, args.force, args.jobs)